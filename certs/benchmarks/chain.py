@@ -0,0 +1,108 @@
+"""
+--chain benchmark over synthetic certificates: issuers found through hash
+indexes (Chains) vs pairwise comparisons, building all leaves' chains
+
+Roots issue intermediates, which issue leaves. Some intermediates are missing,
+leaving their leaves' chains incomplete.
+
+uv run python benchmarks/chain.py [CERTIFICATES]
+"""
+
+import random
+import sys
+import time
+from datetime import UTC, datetime
+
+from certs import Cert
+from certs.chain import Chains
+
+ROOTS = 10
+INTERMEDIATES = 10  # per root
+MISSING = 0.1  # of intermediates
+
+
+def cert(cn: str, issuer: str) -> Cert:
+    cert = Cert.__new__(Cert)
+    cert.subject = cn
+    cert.subject_dn = f'CN={cn}'
+    cert.issuer_dn = f'CN={issuer}'
+    cert.ski = f'{cn}-key'
+    cert.aki = f'{issuer}-key'
+    cert.fingerprint = cn
+    cert.after = datetime.now(UTC)
+    cert.inode = f'{cn}.pem'
+    return cert
+
+
+def certs(size: int) -> list[Cert]:
+    random.seed(0)
+
+    roots = [f'root{r}' for r in range(ROOTS)]
+    inters = [f'inter{r}.{i}' for r in range(ROOTS) for i in range(INTERMEDIATES)]
+
+    certs = [cert(root, root) for root in roots]
+    certs += [
+        cert(inter, inter.split('.')[0].replace('inter', 'root'))
+        for inter in inters
+        if random.random() > MISSING
+    ]
+    certs += [cert(f'leaf{i}', random.choice(inters)) for i in range(size - len(certs))]
+
+    random.shuffle(certs)
+    return certs
+
+
+def pairwise(certs: list[Cert]) -> list[int]:
+    """Chain lengths, each issuer searched for among all certificates"""
+
+    def issuer(cert: Cert) -> Cert | None:
+        if cert.subject_dn == cert.issuer_dn:
+            return None
+        for other in certs:
+            if other.ski == cert.aki and other is not cert:
+                return other
+
+    issuers = {issuer(cert) for cert in certs}
+
+    lengths = []
+    for cert in certs:
+        if cert in issuers:
+            continue
+        length = 1
+        while cert := issuer(cert):
+            length += 1
+        lengths.append(length)
+
+    return lengths
+
+
+def indexed(certs: list[Cert]) -> list[int]:
+    chains = Chains(certs)
+    return [len(chains.chain(leaf)[0]) for leaf in chains.leaves()]
+
+
+def bench(name: str, build, certs: list[Cert]) -> tuple[float, list[int]]:
+    start = time.perf_counter()
+    lengths = build(certs)
+    elapsed = time.perf_counter() - start
+
+    print(f'{name:>16}: {elapsed:>6.2f} s  ({len(lengths)} chains)')
+    return elapsed, lengths
+
+
+if __name__ == '__main__':
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+
+    print(f'{size} certificates')
+    current, lengths = bench('indexed', indexed, certs(size))
+
+    # pairwise is quadratic: measured on fewer certificates, then scaled
+    small = min(size, 2_000)
+    baseline, expected = bench(f'pairwise ({small})', pairwise, certs(small))
+    _, check = bench(f'indexed ({small})', indexed, certs(small))
+    assert sorted(check) == sorted(expected), 'different chains'
+
+    estimate = baseline * (size / small) ** 2
+    print(
+        f'{"pairwise":>16}: ~{estimate:.0f} s estimated, {estimate / current:.0f}x slower'
+    )
@@ -0,0 +1,110 @@
+"""
+Export benchmark over synthetic certificates: the colored tabulate grid
+(certs -a) vs --export jsonl, csv and columns
+
+For each: time to write, output size and time to read it back, the grid
+being scraped as monitoring did (ANSI codes stripped, cells split on |).
+
+uv run python benchmarks/export.py [CERTIFICATES]
+"""
+
+import csv
+import io
+import json
+import re
+import sys
+import time
+
+from format import properties
+from tabulate import tabulate
+
+from certs import Cert, Headers, Table
+from certs.export import read_columns, values, writers
+
+ansi_re = re.compile(r'\033\[[0-9;]*m')
+
+
+def certs(size: int) -> list[Cert]:
+    certs = []
+    for row in properties(size):
+        cert = Cert.__new__(Cert)
+        (
+            cert.subject,
+            cert.issuer,
+            cert.before,
+            cert.after,
+            _,
+            cert.san,
+            cert.isan,
+            cert.iemail,
+            cert.serial,
+            cert.fingerprint,
+            cert.inode,
+            cert.host,
+        ) = row
+        certs.append(cert)
+
+    return certs
+
+
+def grid(certs: list[Cert]) -> bytes:
+    table = Table.from_rows(cert.properties for cert in certs).formatted()
+    text = tabulate(
+        table.rows(), headers=table.headers, disable_numparse=True, tablefmt='grid'
+    )
+    return text.encode()
+
+
+def scrape(data: bytes) -> list[list[str]]:
+    return [
+        [cell.strip() for cell in line.split('|')[1:-1]]
+        for line in ansi_re.sub('', data.decode()).splitlines()
+        if line.startswith('|')
+    ]
+
+
+def export(fmt: str, certs: list[Cert]) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == 'columns':
+        writer = writers[fmt](buffer, list(Headers))
+    else:
+        out = io.TextIOWrapper(buffer, write_through=True)
+        writer = writers[fmt](out, list(Headers))
+
+    for cert in certs:
+        writer.write(values(cert))
+    writer.close()
+
+    return buffer.getvalue()
+
+
+readers = {
+    'grid': scrape,
+    'jsonl': lambda data: [json.loads(line) for line in data.splitlines()],
+    'csv': lambda data: list(csv.reader(io.StringIO(data.decode()))),
+    'columns': lambda data: read_columns(io.BytesIO(data)),
+}
+
+
+def bench(name: str, write) -> None:
+    start = time.perf_counter()
+    data = write()
+    written = time.perf_counter() - start
+
+    start = time.perf_counter()
+    readers[name](data)
+    read = time.perf_counter() - start
+
+    print(
+        f'{name:>8}: write {written:>6.2f} s, read {read:>6.2f} s,'
+        f' {len(data) / 1024**2:>7.1f} MB'
+    )
+
+
+if __name__ == '__main__':
+    certs = certs(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
+
+    print(f'{len(certs)} certificates')
+    bench('grid', lambda: grid(certs))
+    for fmt in writers:
+        bench(fmt, lambda: export(fmt, certs))
@@ -0,0 +1,114 @@
+"""
+Table benchmark over synthetic rows, from Cert.properties rows to formatted
+rows as fed to tabulate: per-row apply() vs whole column operations
+(PandasTable) vs stdlib lists (Table)
+
+The previous apply() based DataFrame pipeline is kept here as a baseline.
+
+uv run python benchmarks/format.py [ROWS]
+"""
+
+import datetime
+import random
+import sys
+import time
+
+import pandas as pd
+
+from certs import Headers, PandasTable, Table
+from certs import colors as fg
+from certs.table import Expiry
+
+
+def legacy(rows: list[list]) -> list[tuple]:
+    """DataFrame formatting and hex sorting prior to PandasTable"""
+    df = pd.DataFrame(rows, columns=list(Headers))
+    df[Headers.DAYS] = (df[Headers.AFTER] - df[Headers.BEFORE]).dt.days
+
+    df = df.sort_values(by=Headers.SERIAL, key=lambda col: col.apply(int, base=16))
+
+    dt_fmt = '%d %b %Y %H:%S'
+
+    def _dt_split(stamp: str) -> str:
+        date, time = stamp.rsplit(None, 1)
+        return f'{date}{fg.dim} {time}{fg.res}'
+
+    def _days_color(days: int) -> str:
+        if days < Expiry.EXPIRED:
+            color = fg.dim
+        elif days <= Expiry.ALERT:
+            color = fg.red
+        elif days <= Expiry.WARNING:
+            color = fg.yel
+        else:
+            color = fg.grn
+
+        return color + str(days) + fg.res
+
+    for date in (Headers.BEFORE, Headers.AFTER):
+        df[date] = pd.to_datetime(df[date]).dt.strftime(dt_fmt).apply(_dt_split)
+
+    df[Headers.DAYS] = df[Headers.DAYS].apply(_days_color)
+    df[Headers.FILE] = df[Headers.FILE].apply(lambda f: fg.cya + f + fg.res)
+
+    return list(df.itertuples(index=False, name=None))
+
+
+def pandas(rows: list[list]) -> list[tuple]:
+    return PandasTable.from_rows(rows).sort(Headers.SERIAL).formatted().rows()
+
+
+def table(rows: list[list]) -> list[tuple]:
+    return Table.from_rows(rows).sort(Headers.SERIAL).formatted().rows()
+
+
+def properties(size: int) -> list[list]:
+    random.seed(0)
+    now = datetime.datetime.now(datetime.UTC)
+
+    rows = []
+    for i in range(size):
+        after = now + datetime.timedelta(days=random.randint(-30, 400))
+        before = after - datetime.timedelta(days=random.randint(1, 800))
+        rows.append(
+            [
+                f'host{i}.example.com',
+                'Benchmark CA',
+                before,
+                after,
+                None,
+                f'host{i}.example.com',
+                '',
+                'ca@example.com',
+                f'{random.getrandbits(random.randint(60, 159)):X}',
+                f'{random.getrandbits(160):040X}',
+                f'cert{i}.pem',
+                '',
+            ]
+        )
+
+    return rows
+
+
+def bench(name: str, process, rows: list[list]) -> tuple[float, list[tuple]]:
+    start = time.perf_counter()
+    formatted = process(rows)
+    elapsed = time.perf_counter() - start
+
+    print(f'{name:>8}: {elapsed:>6.2f} s')
+    return elapsed, formatted
+
+
+if __name__ == '__main__':
+    rows = properties(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
+
+    print(f'{len(rows)} rows')
+    baseline, expected = bench('legacy', legacy, rows)
+    current, formatted = bench('pandas', pandas, rows)
+    assert formatted == expected, 'different output'
+    stdlib, formatted = bench('table', table, rows)
+    assert formatted == expected, 'different output'
+
+    print(
+        f'{"speedup":>8}: {baseline / current:.2f}x pandas, {baseline / stdlib:.2f}x table'
+    )
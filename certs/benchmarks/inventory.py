@@ -0,0 +1,63 @@
+"""
+--inventory benchmark: a certs process per host mirror, as in a shell loop,
+vs a single certs --inventory run over all of them
+
+Each host mirror holds certificates of its own, plus some shared by all hosts
+(e.g. a wildcard certificate). Certificates get parsed each run (--no-cache).
+
+uv run python benchmarks/inventory.py [HOSTS] [CERTIFICATES_PER_HOST]
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+from subprocess import DEVNULL, run
+
+import synthetic
+
+SHARED = 0.25  # of each host's certificates
+
+code = 'import sys, certs; sys.argv[0] = "certs"; certs.main()'
+
+
+def certs(*args: str) -> None:
+    run(
+        [sys.executable, '-c', code, '--no-cache', *args],
+        stdout=DEVNULL,
+        stderr=DEVNULL,
+        check=True,
+    )
+
+
+if __name__ == '__main__':
+    hosts = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    shared = int(size * SHARED)
+    pems = synthetic.pems(shared + hosts * (size - shared))
+
+    with tempfile.TemporaryDirectory() as folder:
+        mirrors = []
+        for host in range(hosts):
+            mirror = Path(folder, f'host{host}')
+            mirror.mkdir()
+            own = shared + host * (size - shared)
+            for i, pem in enumerate(pems[:shared] + pems[own : own + size - shared]):
+                (mirror / f'cert{i}.pem').write_bytes(pem)
+            mirrors.append(str(mirror))
+
+        print(f'{hosts} hosts, {size} certificates each ({shared} shared)')
+
+        start = time.perf_counter()
+        for mirror in mirrors:
+            certs(mirror)
+        loop = time.perf_counter() - start
+        print(f'{"loop":>10}: {loop:>6.2f} s')
+
+        start = time.perf_counter()
+        certs('--inventory', *mirrors)
+        inventory = time.perf_counter() - start
+        print(f'{"inventory":>10}: {inventory:>6.2f} s')
+
+    print(f'{"speedup":>10}: {loop / inventory:.2f}x')
@@ -0,0 +1,48 @@
+"""
+FOLDER loading benchmark: certificates parsed in-process vs in a process pool,
+vs read from the parse cache
+
+uv run python benchmarks/load.py [CERTIFICATES] [JOBS]
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import synthetic
+
+from certs import Cache, load_certs
+
+
+def bench(
+    name: str, folder: Path, jobs: int | None, cache: Cache | None = None
+) -> float:
+    start = time.perf_counter()
+    certs = asyncio.run(load_certs(folder, debug=False, jobs=jobs, cache=cache))
+    rows = [cert.properties for cert in certs]  # as main() does
+    elapsed = time.perf_counter() - start
+
+    print(f'{name:>8}: {elapsed:>6.2f} s  ({len(rows) / elapsed:,.0f} certs/sec)')
+    return elapsed
+
+
+if __name__ == '__main__':
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    jobs = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    with tempfile.TemporaryDirectory() as folder:
+        synthetic.write(Path(folder), size)
+
+        print(f'{size} certificates')
+        serial = bench('serial', Path(folder), jobs=1)
+        parallel = bench('parallel', Path(folder), jobs=jobs)
+
+        cache = Cache(Path(folder, 'cache.sqlite'))
+        asyncio.run(load_certs(Path(folder), debug=False, jobs=jobs, cache=cache))
+        cached = bench('cached', Path(folder), jobs=jobs, cache=cache)
+
+    print(
+        f'{"speedup":>8}: {serial / parallel:.2f}x parallel, {serial / cached:.2f}x cached'
+    )
@@ -0,0 +1,70 @@
+"""
+certs startup benchmark: a single PEM file, with the stdlib Table vs --pandas
+
+Also shows the cumulative import time of certs (python -X importtime), and
+whether pandas got imported.
+
+uv run python benchmarks/startup.py [PEM]
+"""
+
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+from subprocess import DEVNULL, PIPE, run
+
+import synthetic
+
+ROUNDS = 5
+
+import_re = re.compile(
+    r'import time: +\d+ \| +(?P<cumulative>\d+) \| (?P<module> *[\w.]+)'
+)
+
+
+def certs(*args: str) -> float:
+    """Best wall time of a certs run, in seconds"""
+    code = 'import sys, certs; sys.argv[0] = "certs"; certs.main()'
+
+    times = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        run([sys.executable, '-c', code, *args], stdout=DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+def import_times() -> dict[str, int]:
+    """Cumulative import time in microseconds per module, import certs"""
+    proc = run(
+        [sys.executable, '-X', 'importtime', '-c', 'import certs'],
+        stderr=PIPE,
+        text=True,
+        check=True,
+    )
+
+    return {
+        match['module'].strip(): int(match['cumulative'])
+        for match in import_re.finditer(proc.stderr)
+    }
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as folder:
+        if len(sys.argv) > 1:
+            pem = sys.argv[1]
+        else:
+            pem = Path(folder, 'cert.pem')
+            pem.write_bytes(synthetic.pems(1)[0])
+
+        times = import_times()
+        print(f'import certs: {times["certs"] / 1000:.1f} ms', end='')
+        print(' (pandas imported)' if 'pandas' in times else '')
+
+        table = certs(str(pem))
+        pandas = certs('--pandas', str(pem))
+
+    print(f'{"table":>12}: {table * 1000:>6.0f} ms')
+    print(f'{"--pandas":>12}: {pandas * 1000:>6.0f} ms')
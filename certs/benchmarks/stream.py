@@ -0,0 +1,59 @@
+"""
+--stream benchmark: time to the first row, total time and peak memory, on a
+FOLDER of synthetic certificates, for the table vs each --stream format
+
+Certificates get parsed each run (--no-cache).
+
+uv run python benchmarks/stream.py [CERTIFICATES]
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+from subprocess import PIPE, Popen
+
+import synthetic
+
+# run certs, report its peak RSS (kB) on stderr
+code = """
+import resource, sys, certs
+sys.argv[0] = 'certs'
+try:
+    certs.main()
+finally:
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(usage, file=sys.stderr)
+"""
+
+
+def bench(name: str, *args: str) -> None:
+    start = time.perf_counter()
+    with Popen(
+        [sys.executable, '-c', code, '--no-cache', *args],
+        stdout=PIPE,
+        stderr=PIPE,
+        text=True,
+    ) as proc:
+        lines = 1 if proc.stdout.readline() else 0
+        first = time.perf_counter() - start
+        lines += sum(1 for _ in proc.stdout)
+        elapsed = time.perf_counter() - start
+        rss = int(proc.stderr.read().split()[-1]) / 1024
+
+    print(
+        f'{name:>8}: first line {first:>6.2f} s, all {elapsed:>6.2f} s,'
+        f' {lines:>7} lines, {rss:>5.0f} MB'
+    )
+
+
+if __name__ == '__main__':
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+
+    with tempfile.TemporaryDirectory() as folder:
+        synthetic.write(Path(folder), size)
+
+        print(f'{size} certificates')
+        bench('table', folder)
+        for fmt in ('fixed', 'tsv', 'jsonl'):
+            bench(fmt, folder, '--stream', fmt)
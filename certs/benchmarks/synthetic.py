@@ -0,0 +1,59 @@
+"""
+Synthetic certificates for the benchmarks
+
+All signed by the same CA key, with random validity periods and SANs.
+"""
+
+import datetime
+import random
+from pathlib import Path
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+
+def pems(size: int) -> list[bytes]:
+    random.seed(0)
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    issuer = x509.Name(
+        [
+            x509.NameAttribute(NameOID.COMMON_NAME, 'Benchmark CA'),
+            x509.NameAttribute(NameOID.EMAIL_ADDRESS, 'ca@example.com'),
+        ]
+    )
+    now = datetime.datetime.now(datetime.UTC)
+
+    certs = []
+    for i in range(size):
+        cn = f'host{i}.example.com'
+        after = now + datetime.timedelta(days=random.randint(-30, 400))
+        before = after - datetime.timedelta(days=random.randint(90, 800))
+
+        cert = (
+            x509.CertificateBuilder()
+            .subject_name(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, cn)]))
+            .issuer_name(issuer)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(before)
+            .not_valid_after(after)
+            .add_extension(
+                x509.SubjectAlternativeName(
+                    [x509.DNSName(cn), x509.DNSName(f'www.{cn}')]
+                ),
+                critical=False,
+            )
+            .sign(key, hashes.SHA256())
+        )
+        certs.append(cert.public_bytes(serialization.Encoding.PEM))
+
+    return certs
+
+
+def write(folder: Path, size: int) -> None:
+    """size .pem files in folder"""
+    for i, pem in enumerate(pems(size)):
+        (folder / f'cert{i}.pem').write_bytes(pem)
@@ -1,23 +1,31 @@
 import argparse
 import asyncio
 import itertools
-from datetime import datetime
-from enum import IntEnum, StrEnum
+import os
+import sqlite3
+import sys
+from datetime import UTC, datetime
 from pathlib import Path
 from subprocess import PIPE, run
-from typing import Sequence
+from typing import AsyncIterable, AsyncIterator, Iterator, Sequence
 
 import aiofiles
-import pandas as pd
 from cryptography import x509
 from cryptography.hazmat.primitives import hashes
 from cryptography.x509.base import Certificate
-from cryptography.x509.extensions import ExtensionNotFound
 from cryptography.x509.oid import ExtensionOID, NameOID
 from tabulate import tabulate
 from tqdm.asyncio import tqdm
 
 from . import colors as fg
+from . import export, stream
+from .cache import Cache
+from .chain import Chains, Status
+from .table import Headers, PandasTable, Table
+
+CHUNK_SIZE = 256  # certificates parsed per worker process task
+READERS = 64  # files open at once
+PANDAS_ROWS = 100_000  # certificates from which PandasTable is faster than Table
 
 # TODO:
 # - tests
@@ -34,60 +42,115 @@ class Cert:
 
     Get values of existing properties and expose them with shorter names
 
+    All values are extracted at once, walking names and extensions a single
+    time. The Certificate itself isn't kept: Certs are small and picklable
+    (process pools).
+
     Attributes:
         inode: File or FOLDER/ to gather certificates from
+        root: FOLDER/ scanned, inode gets shown relative to it
+        host: --inventory host the FOLDER/ mirrors
     """
 
-    def __init__(self, inode: Path, cert: Certificate):
-        self._cert = cert
-        self.inode = inode.name
-
-    def _values(self, attr, oid: x509.ObjectIdentifier) -> str:
-        """Get an usable value out of an attribute"""
-        return '\n'.join(a.value for a in attr.get_attributes_for_oid(oid))
-
-    def _dns_names(self, extension) -> str:
-        try:
-            ext = self._cert.extensions.get_extension_for_oid(extension)
-            return '\n'.join(ext.value.get_values_for_type(x509.DNSName))
-        except ExtensionNotFound:
-            return ''
-
-    @property
-    def subject(self) -> str:
-        return self._values(self._cert.subject, NameOID.COMMON_NAME)
-
-    @property
-    def issuer(self) -> str:
-        return self._values(self._cert.issuer, NameOID.COMMON_NAME)
-
-    @property
-    def before(self) -> datetime:
-        return self._cert.not_valid_before_utc
-
-    @property
-    def after(self) -> datetime:
-        return self._cert.not_valid_after_utc
-
-    @property
-    def san(self) -> str:
-        return self._dns_names(ExtensionOID.SUBJECT_ALTERNATIVE_NAME)
-
-    @property
-    def isan(self) -> str:
-        return self._dns_names(ExtensionOID.ISSUER_ALTERNATIVE_NAME)
+    # values kept by the cache
+    fields = (
+        'subject',
+        'issuer',
+        'before',
+        'after',
+        'san',
+        'isan',
+        'iemail',
+        'serial',
+        'fingerprint',
+        'subject_dn',
+        'issuer_dn',
+        'ski',
+        'aki',
+    )
 
-    @property
-    def iemail(self) -> str:
-        return self._values(self._cert.issuer, NameOID.EMAIL_ADDRESS)
-
-    @property
-    def serial(self) -> str:
-        return f'{self._cert.serial_number:X}'
-
-    @property
-    def fingerprint(self) -> str:
-        return self._cert.fingerprint(hashes.SHA1()).hex().upper()
+    __slots__ = (*fields, 'inode', 'host')
+
+    subject: str
+    issuer: str
+    before: datetime
+    after: datetime
+    san: str
+    isan: str
+    iemail: str
+    serial: str
+    fingerprint: str
+    subject_dn: str  # RFC 4514, for --chain
+    issuer_dn: str
+    ski: str  # subject key identifier (hex), '' if none
+    aki: str  # authority key identifier (hex), '' if none
+
+    def __init__(
+        self,
+        inode: Path,
+        cert: Certificate,
+        root: Path | None = None,
+        host: str = '',
+    ):
+        self.inode = str(inode.relative_to(root)) if root else inode.name
+        self.host = host
+
+        subject = self._values(cert.subject, NameOID.COMMON_NAME)
+        self.subject = subject[NameOID.COMMON_NAME]
+
+        issuer = self._values(cert.issuer, NameOID.COMMON_NAME, NameOID.EMAIL_ADDRESS)
+        self.issuer = issuer[NameOID.COMMON_NAME]
+        self.iemail = issuer[NameOID.EMAIL_ADDRESS]
+
+        self.before = cert.not_valid_before_utc
+        self.after = cert.not_valid_after_utc
+
+        self.subject_dn = cert.subject.rfc4514_string()
+        self.issuer_dn = cert.issuer.rfc4514_string()
+
+        self.san = self.isan = self.ski = self.aki = ''
+        for ext in cert.extensions:
+            if ext.oid == ExtensionOID.SUBJECT_ALTERNATIVE_NAME:
+                self.san = '\n'.join(ext.value.get_values_for_type(x509.DNSName))
+            elif ext.oid == ExtensionOID.ISSUER_ALTERNATIVE_NAME:
+                self.isan = '\n'.join(ext.value.get_values_for_type(x509.DNSName))
+            elif ext.oid == ExtensionOID.SUBJECT_KEY_IDENTIFIER:
+                self.ski = ext.value.digest.hex()
+            elif ext.oid == ExtensionOID.AUTHORITY_KEY_IDENTIFIER:
+                self.aki = (ext.value.key_identifier or b'').hex()
+
+        self.serial = f'{cert.serial_number:X}'
+        self.fingerprint = cert.fingerprint(hashes.SHA1()).hex().upper()
+
+    @staticmethod
+    def _values(name: x509.Name, *oids: x509.ObjectIdentifier) -> dict:
+        """Get usable values out of a name's attributes, in one pass"""
+        values = {oid: [] for oid in oids}
+        for attr in name:
+            if attr.oid in values:
+                values[attr.oid].append(attr.value)
+
+        return {oid: '\n'.join(value) for oid, value in values.items()}
+
+    def to_cache(self) -> dict:
+        values = {field: getattr(self, field) for field in self.fields}
+        values['before'] = self.before.timestamp()
+        values['after'] = self.after.timestamp()
+        return values
+
+    @classmethod
+    def from_cache(
+        cls, values: dict, inode: Path, root: Path | None = None, host: str = ''
+    ) -> 'Cert':
+        """Cert out of cached values"""
+        cert = cls.__new__(cls)
+        for field in cls.fields:
+            setattr(cert, field, values[field])
+        cert.before = datetime.fromtimestamp(values['before'], UTC)
+        cert.after = datetime.fromtimestamp(values['after'], UTC)
+        cert.inode = str(inode.relative_to(root)) if root else inode.name
+        cert.host = host
+        return cert
 
     # dir() can't be used as it sorts the result
     @property
@@ -104,15 +167,10 @@ class Cert:
             self.serial,
             self.fingerprint,
             self.inode,
+            self.host,
         ]
 
 
-class Expiry(IntEnum):
-    EXPIRED = 0
-    ALERT = 7  # one week
-    WARNING = 14  # two weeks
-
-
 async def a_read(file: Path) -> tuple[Path, str]:
     """Asynchronously read file contents
 
@@ -126,41 +184,288 @@ async def a_read(file: Path) -> tuple[Path, str]:
     return (file, contents)
 
 
-async def load_certs(inode: Path, debug: bool) -> list[Cert]:
-    """Load certificates
+def root_of(file: Path, folders: dict[Path, str]) -> Path:
+    """FOLDER/ file was found in, the closest one"""
+    return next(parent for parent in file.parents if parent in folders)
 
-    For a File, get all bundled certificates.
-    For a FOLDER, get all certificates in that FOLDER.
+
+def parse_chunk(
+    chunk: list[tuple[Path, bytes]], folders: dict[Path, str]
+) -> list[tuple[Path, Cert | None]]:
+    """Parse PEM contents, in a worker process
 
     Args:
-        inode: File or FOLDER/ on the file system
+        folders: FOLDER/ -> host, the files were found in
 
     Returns:
-        certificates
+        (file, certificate or None if it couldn't be loaded)...
     """
 
     certs = []
 
-    if inode.is_dir():
-        exts = ('.pem', '.crt', '.cer')
-
-        async with asyncio.TaskGroup() as tg:
-            tasks = tqdm(
-                [
-                    tg.create_task(a_read(file))
-                    for file in inode.iterdir()
-                    if file.suffix in exts
-                ],
-                bar_format='{l_bar}{bar:90}{r_bar}',
-                leave=False,
-            )
+    for file, pem in chunk:
+        root = root_of(file, folders)
+        try:
+            cert = x509.load_pem_x509_certificate(pem)
+            certs.append((file, Cert(file, cert, root, folders[root])))
+        except ValueError:
+            certs.append((file, None))
+
+    return certs
+
+
+def walk(folder: Path, recursive: bool = False) -> Iterator[Path]:
+    """Certificate files in FOLDER, as they are found (os.scandir)
+
+    Symlinked folders aren't followed, to avoid cycles
+    """
+
+    exts = ('.pem', '.crt', '.cer')
+    folders = [folder]
+
+    while folders:
+        try:
+            entries = os.scandir(folders.pop())
+        except OSError:
+            continue
+
+        with entries:
+            for entry in entries:
+                try:
+                    if recursive and entry.is_dir(follow_symlinks=False):
+                        folders.append(Path(entry.path))
+                    elif entry.name.endswith(exts) and entry.is_file():
+                        yield Path(entry.path)
+                except OSError:
+                    pass
+
+
+async def a_read_all(
+    files: AsyncIterable[Path], debug: bool, readers: int = READERS
+) -> AsyncIterator[tuple[Path, bytes]]:
+    """Asynchronously read files as they come, no more than readers at a time
+
+    Yields:
+        (file, contents) as reads complete
+    """
+
+    semaphore = asyncio.Semaphore(readers)
+    pending: set[asyncio.Task] = set()
 
-        for task in tasks:
-            file, pem = task.result()
+    async def read(file: Path) -> tuple[Path, bytes] | None:
+        try:
+            return await a_read(file)
+        except OSError:
+            fg.info(debug, f'unable to read file:{fg.res}', file)
+        finally:
+            semaphore.release()
+
+    async for file in files:
+        await semaphore.acquire()
+        pending.add(asyncio.create_task(read(file)))
+
+        done = {task for task in pending if task.done()}
+        pending -= done
+        for task in done:
+            if task.result():
+                yield task.result()
+
+    for task in asyncio.as_completed(pending):
+        if result := await task:
+            yield result
+
+
+async def a_parse_all(
+    contents: AsyncIterator[tuple[Path, bytes]],
+    folders: dict[Path, str],
+    jobs: int | None,
+) -> AsyncIterator[tuple[Path, Cert | None]]:
+    """Parse certificates as their files get read
+
+    Contents are parsed in chunks. Once a chunk fills up, it and the next
+    ones get handed to a process pool, each parsed by a worker while the
+    following chunks are being read. Reading waits once two chunks per
+    worker are pending, so that memory doesn't grow with FOLDER.
+
+    Args:
+        folders: FOLDER/ -> host, the files were found in
+        jobs: worker processes (default: number of CPUs), 1 to parse in-process
+
+    Yields:
+        (file, certificate or None if it couldn't be loaded)
+    """
+
+    loop = asyncio.get_running_loop()
+    pool = None
+    max_chunks = 2 * (jobs or os.cpu_count() or 1)  # being parsed at once
+    chunks = []  # being parsed
+    chunk = []
+
+    try:
+        async for file, pem in contents:
+            chunk.append((file, pem))
+            if len(chunk) < CHUNK_SIZE:
+                continue
+
+            if jobs == 1:
+                for parsed in parse_chunk(chunk, folders):
+                    yield parsed
+            else:
+                if not pool:
+                    from concurrent.futures import ProcessPoolExecutor
+
+                    pool = ProcessPoolExecutor(jobs)
+                chunks.append(loop.run_in_executor(pool, parse_chunk, chunk, folders))
+
+                while chunks and (chunks[0].done() or len(chunks) > max_chunks):
+                    for parsed in await chunks.pop(0):
+                        yield parsed
+            chunk = []
+
+        for parsing in chunks:
+            for parsed in await parsing:
+                yield parsed
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+
+    for parsed in parse_chunk(chunk, folders):
+        yield parsed
+
+
+async def a_load_folders(
+    folders: dict[Path, str],
+    debug: bool,
+    jobs: int | None = None,
+    recursive: bool = False,
+    cache: Cache | None = None,
+    progress: bool = True,
+) -> AsyncIterator[Cert]:
+    """Load certificates in FOLDERs, yielding them as they get parsed
+
+    All FOLDERs share the same readers (a_read_all), worker processes
+    (a_parse_all) and cache. Files get read as the walk finds them, cached
+    certificates yielded as they are found.
+
+    Args:
+        folders: FOLDER/ -> host, see Cert
+        jobs: worker processes (default: number of CPUs)
+        recursive: include certificates in sub-folders, FOLDERs mustn't nest
+        cache: files unchanged since cached aren't read again
+        progress: show a progress bar, on stderr
+    """
+
+    with tqdm(
+        desc='certificates',
+        bar_format='{desc}: {n_fmt} [{elapsed}, {rate_fmt}]',
+        unit='cert',
+        leave=False,
+        disable=not progress,
+    ) as bar:
+        found = itertools.chain.from_iterable(
+            walk(folder, recursive) for folder in folders
+        )
+
+        # files to read, fed by the walk below, None once it's over
+        queue: asyncio.Queue[Path | None] = asyncio.Queue()
+        results: asyncio.Queue[tuple[Path, Cert | None] | None] = asyncio.Queue()
+        stats = {}  # of files to read, for the cache
+
+        async def queued() -> AsyncIterator[Path]:
+            while (file := await queue.get()) is not None:
+                yield file
+
+        async def parse() -> None:
             try:
-                certs.append(Cert(file, x509.load_pem_x509_certificate(pem)))
-            except ValueError:
+                contents = a_read_all(queued(), debug)
+                async for result in a_parse_all(contents, folders, jobs):
+                    results.put_nowait(result)
+            finally:
+                results.put_nowait(None)
+
+        def parsed(file: Path, cert: Cert | None) -> Cert | None:
+            if cache:
+                cache.put(file, stats.pop(file), cert and cert.to_cache())
+            if not cert:
                 fg.info(debug, f'unable to load PEM file:{fg.res}', file.name)
+            return cert
+
+        task = asyncio.create_task(parse())
+        failed = False
+        try:
+            for file in found:
+                if cache:
+                    try:
+                        st = file.stat()
+                    except OSError:
+                        continue
+
+                    values = cache.get(file, st)
+                    if values is None:
+                        fg.info(debug, f'unable to load PEM file:{fg.res}', file.name)
+                        continue
+                    if values is not False:
+                        root = root_of(file, folders)
+                        bar.update()
+                        yield Cert.from_cache(values, file, root, folders[root])
+                        continue
+                    stats[file] = st
+
+                queue.put_nowait(file)
+                await asyncio.sleep(0)  # let reads and parses proceed
+
+                while not results.empty():
+                    if (result := results.get_nowait()) is None:
+                        failed = True  # raised by await task below
+                        break
+                    if cert := parsed(*result):
+                        bar.update()
+                        yield cert
+                if failed:
+                    break
+            else:
+                queue.put_nowait(None)
+
+                while (result := await results.get()) is not None:
+                    if cert := parsed(*result):
+                        bar.update()
+                        yield cert
+
+            await task  # errors raised while reading or parsing
+        finally:
+            task.cancel()
+
+        if cache:
+            cache.save()
+
+
+async def a_load_all(
+    inode: Path,
+    debug: bool,
+    jobs: int | None = None,
+    recursive: bool = False,
+    cache: Cache | None = None,
+    progress: bool = True,
+) -> AsyncIterator[Cert]:
+    """Load certificates, yielding them as they get parsed
+
+    For a File, get all bundled certificates.
+    For a FOLDER, get all certificates in that FOLDER, read and parsed
+    concurrently (see a_load_folders)
+
+    Args:
+        inode: File or FOLDER/ on the file system
+        jobs: worker processes for FOLDERs (default: number of CPUs)
+        recursive: include certificates in sub-folders
+        cache: FOLDER files unchanged since cached aren't read again
+        progress: show a progress bar for FOLDERs, on stderr
+    """
+
+    if inode.is_dir():
+        async for cert in a_load_folders(
+            {inode: ''}, debug, jobs, recursive, cache, progress
+        ):
+            yield cert
 
     elif inode.is_file():
         with open(inode, 'rb') as f:
@@ -168,25 +473,70 @@ async def load_certs(inode: Path, debug: bool) -> list[Cert]:
 
         for c in x509.load_pem_x509_certificates(pem):
             try:
-                certs.append(Cert(inode, c))
+                yield Cert(inode, c)
             except ValueError:
                 fg.info(debug, f'unable to load PEM file:{fg.res}', inode.name)
 
-    return certs
 
+async def a_load_inventory(
+    folders: dict[Path, str],
+    debug: bool,
+    jobs: int | None = None,
+    recursive: bool = False,
+    cache: Cache | None = None,
+    progress: bool = True,
+) -> AsyncIterator[Cert]:
+    """Load certificates in FOLDERs mirroring hosts, merged by fingerprint
 
-class Headers(StrEnum):
-    SUBJECT = 'Subject CN'
-    ISSUER = 'Issuer CN'
-    BEFORE = 'From'
-    AFTER = 'To'
-    DAYS = 'Days Left'
-    SAN = 'Subject Alternative Name'
-    ISAN = 'Issuer Alternative Name'
-    IEMAIL = 'Issuer Email'
-    SERIAL = 'Serial Number'
-    FINGERPRINT = 'SHA1 Fingerprint'
-    FILE = 'File'
+    A certificate found in several FOLDERs is yielded once, its host listing
+    all of theirs (comma separated). Certificates are yielded once all are
+    loaded, see a_load_folders
+    """
+
+    merged: dict[str, Cert] = {}
+    hosts: dict[str, dict[str, None]] = {}  # fingerprint -> hosts, in order
+
+    async for cert in a_load_folders(folders, debug, jobs, recursive, cache, progress):
+        merged.setdefault(cert.fingerprint, cert)
+        hosts.setdefault(cert.fingerprint, {})[cert.host] = None
+
+    for fingerprint, cert in merged.items():
+        cert.host = ', '.join(hosts[fingerprint])
+        yield cert
+
+
+async def load_certs(
+    inode: Path,
+    debug: bool,
+    jobs: int | None = None,
+    recursive: bool = False,
+    cache: Cache | None = None,
+) -> list[Cert]:
+    """Load certificates, see a_load_all
+
+    Returns:
+        certificates
+    """
+
+    return [cert async for cert in a_load_all(inode, debug, jobs, recursive, cache)]
+
+
+async def load_inventory(
+    folders: dict[Path, str],
+    debug: bool,
+    jobs: int | None = None,
+    recursive: bool = False,
+    cache: Cache | None = None,
+) -> list[Cert]:
+    """Load certificates, see a_load_inventory
+
+    Returns:
+        certificates
+    """
+
+    return [
+        cert async for cert in a_load_inventory(folders, debug, jobs, recursive, cache)
+    ]
 
 
 def validate_fields(fields: str) -> Sequence[int]:
@@ -223,11 +573,29 @@ def validate_sort(sort: str) -> str:
     raise ValueError
 
 
+def validate_jobs(jobs: str) -> int:
+    if int(jobs) >= 1:
+        return int(jobs)
+
+    fg.warn(True, '--jobs: 1 or more processes expected')
+    raise ValueError
+
+
+def validate_folder(folder: str) -> tuple[str, Path]:
+    """[HOST=]FOLDER: (HOST, FOLDER), HOST defaulting to FOLDER's name"""
+    host, sep, path = folder.partition('=')
+    if not sep or '/' in host:
+        host, path = '', folder
+
+    return host or Path(path).resolve().name, Path(path)
+
+
 def main():
     parser = argparse.ArgumentParser(
-        usage='%(prog)s [-d] [-f FIELDS] [-a] [-c|-s] [-e] [--search [CN]] [File|FOLDER]',
+        usage='%(prog)s [-d] [-f FIELDS] [-a] [-r] [--no-cache] [-j JOBS] [--pandas] [-c|-s|--stream [FORMAT]|--export FORMAT] [-e] [--search [CN]] [-I [HOST=]FOLDER... | File|FOLDER]',
         description='Extract info from certificates. Handier than `openssl ...` in a loop.',
         formatter_class=argparse.RawTextHelpFormatter,
+        fromfile_prefix_chars='@',
     )
     parser.add_argument(
         '-d', '--debug', action='store_true', help='output all warnings'
@@ -239,10 +607,32 @@ def main():
         help=f'e.g. 5,1-3,7-9 (5th, 1st to 3rd, 7th to 9th)\n{help_fields()}',
     )
     parser.add_argument('-a', '--all', action='store_true', help='include all fields')
+    parser.add_argument(
+        '-r', '--recursive', action='store_true', help='FOLDER: include sub-folders'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='FOLDER: parse all files, even those unchanged since the last run',
+    )
+    parser.add_argument(
+        '--pandas',
+        action='store_true',
+        help=f'process the table with pandas, the default from {PANDAS_ROWS} certificates',
+    )
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        type=validate_jobs,
+        help='FOLDER: processes parsing certificates (default: number of CPUs)\n1: parse in this process',
+    )
 
     e_group = parser.add_mutually_exclusive_group()
     e_group.add_argument(
-        '-c', '--chain', action='store_true', help='show bundled Subject/Issuer CNs'
+        '-c',
+        '--chain',
+        action='store_true',
+        help=f'show chains, from each leaf certificate up to its root\n{fg.ita}red:{fg.res} issuer missing or loop, exit status 1',
     )
     e_group.add_argument(
         '-s',
@@ -253,6 +643,20 @@ def main():
         const=Headers.SUBJECT.name.lower(),
         help='the shortest match can be used: -sd (sort by d[a[y[s]]]\ndefault: subject',
     )
+    e_group.add_argument(
+        '--stream',
+        metavar='FORMAT',
+        choices=stream.writers,
+        nargs='?',
+        const='fixed',
+        help=f'write certificates as they get loaded, unsorted\n{", ".join(stream.writers)} (default: fixed)',
+    )
+    e_group.add_argument(
+        '--export',
+        metavar='FORMAT',
+        choices=export.writers,
+        help=f'write all fields (or -f) for other programs, as certificates get loaded\n{", ".join(export.writers)}: binary, compressed',
+    )
 
     parser.add_argument(
         '-e',
@@ -268,47 +672,180 @@ def main():
         const=True,
         help='filter certificates by Subject CN\nhttps://github.com/junegunn/fzf#search-syntax',
     )
+    parser.add_argument(
+        '-I',
+        '--inventory',
+        metavar='[HOST=]FOLDER',
+        type=validate_folder,
+        nargs='+',
+        help='one report over FOLDERs mirroring hosts, with a host column\ncertificates found on several hosts are merged (SHA1 fingerprint)\nHOST default: FOLDER name, @FILE: read [HOST=]FOLDERs from FILE, one per line',
+    )
     parser.add_argument(
         'inode',
         metavar=('File|FOLDER'),
         type=Path,
         nargs='?',
-        default='.',
         help='source to gather certificates from (default: .)',
     )
     args = parser.parse_args()
 
-    # File|FOLDER
-    if args.inode.exists():
+    if args.inventory and args.inode is not None:
+        parser.error('argument File|FOLDER: not allowed with argument -I/--inventory')
+    if args.inode is None:
+        args.inode = Path('.')
+
+    # --inventory: FOLDER/ -> host
+    folders = {}
+    resolved = {}  # a FOLDER mirrors a single host
+    for host, folder in args.inventory or []:
+        if not folder.is_dir():
+            fg.warn(True, f'--inventory: not a FOLDER, skipped:{fg.res}', folder)
+            continue
+
+        real = folder.resolve()
+        if real in resolved:
+            if resolved[real] != host:
+                fg.abort(
+                    f'--inventory: FOLDER given for {resolved[real]} and {host}:{fg.res}',
+                    folder,
+                )
+            fg.warn(True, f'--inventory: FOLDER given twice, skipped:{fg.res}', folder)
+            continue
+
+        # -r: files in both would get loaded twice
+        if args.recursive:
+            for other in resolved:
+                if real.is_relative_to(other) or other.is_relative_to(real):
+                    fg.abort(
+                        f'--inventory: FOLDERs nested within each other:{fg.res}',
+                        other,
+                        real,
+                    )
+
+        resolved[real] = host
+        folders[folder] = host
+    if args.inventory and not folders:
+        fg.abort('Valid FOLDERs expected')
+
+    cache = None
+    if not args.no_cache and (folders or args.inode.is_dir()):
+        try:
+            cache = Cache()
+        except (OSError, sqlite3.Error) as err:
+            fg.warn(args.debug, f'no cache:{fg.res}', err)
+
+    # -f, --all (--export: all fields by default)
+    headers = list(Headers)
+    if args.fields:
+        if not all(0 <= f < len(headers) for f in args.fields):
+            fg.abort(f'field limits:{fg.res} 1 <= ... <= {len(headers)}')
+        headers = [headers[f] for f in args.fields]
+    else:
+        if args.all or args.export:
+            headers.remove(Headers.HOST)
+        else:
+            headers = [
+                Headers.SUBJECT,
+                Headers.ISSUER,
+                Headers.BEFORE,
+                Headers.AFTER,
+                Headers.DAYS,
+                Headers.FILE,
+            ]
+        # --inventory: host first
+        if folders:
+            headers.insert(0, Headers.HOST)
+
+    # --stream, --export: write rows as certificates get loaded
+    if (args.stream or args.export) and (folders or args.inode.exists()):
+        if args.search is True:
+            fg.abort('--stream/--export: fzf needs all certificates, use --search CN')
+        # before writers start writing (headers, magic)
+        if args.expiring_soon and Headers.DAYS not in headers:
+            fg.abort('"days" field missing')
+
+        if args.export == 'columns':
+            if sys.stdout.isatty():
+                fg.abort('--export columns: binary output, redirect it to a file')
+            writer = export.Columns(sys.stdout.buffer, headers)
+        elif args.export:
+            writer = export.writers[args.export](sys.stdout, headers)
+        else:
+            writer = stream.writers[args.stream](sys.stdout, headers)
+
+        if folders:
+            certs = a_load_inventory(
+                folders, args.debug, args.jobs, args.recursive, cache, progress=False
+            )
+        else:
+            certs = a_load_all(
+                args.inode, args.debug, args.jobs, args.recursive, cache, progress=False
+            )
+        try:
+            asyncio.run(stream.a_stream(certs, writer, args.search, args.expiring_soon))
+        except BrokenPipeError:  # e.g. | head
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        exit()
+
+    # --inventory FOLDERs, File|FOLDER
+    if folders:
+        certs = (
+            asyncio.run(
+                load_inventory(folders, args.debug, args.jobs, args.recursive, cache)
+            )
+            or exit()
+        )
+    elif args.inode.exists():
         certs = (
             # load certificates
-            asyncio.run(load_certs(args.inode, args.debug)) or exit()
+            asyncio.run(
+                load_certs(args.inode, args.debug, args.jobs, args.recursive, cache)
+            )
+            or exit()
         )
     else:
         fg.abort('Valid File|FOLDER expected')
 
+    # --chain: from each leaf up to its root
     if args.chain:
-        if args.inode.is_file():
-            print(
-                '\n\n'.join(
-                    f'{Headers.SUBJECT}:  {cert.subject}\n {fg.dim}{Headers.ISSUER}:{fg.res}  {cert.issuer}'
-                    for cert in certs
+        chains = Chains(certs)
+        leaves = chains.leaves()
+        # keep the order of bundled certificates
+        if folders or not args.inode.is_file():
+            leaves.sort(key=lambda leaf: leaf.subject.lower())
+
+        broken = 0
+        for leaf in leaves:
+            links, status = chains.chain(leaf)
+
+            print(f'{Headers.SUBJECT}:  {leaf.subject}  {fg.cya}{leaf.inode}{fg.res}')
+            for cert in links[1:]:
+                print(
+                    f' {fg.dim}{Headers.ISSUER}:{fg.res}  {cert.subject}  {fg.cya}{cert.inode}{fg.res}'
                 )
-            )
-            exit()
-        else:
-            fg.abort(
-                f"-c bad argument:{fg.res} {fg.dir}{args.inode.name}{fg.res} isn't a file"
-            )
+            if status == Status.INCOMPLETE:
+                print(
+                    f' {fg.dim}{Headers.ISSUER}:{fg.res}  {fg.red}{status}:{fg.res} {links[-1].issuer_dn}'
+                )
+            elif status == Status.LOOP:
+                print(f' {fg.dim}{Headers.ISSUER}:{fg.res}  {fg.red}{status}{fg.res}')
+            print()
+
+            broken += status != Status.COMPLETE
 
-    # Create pandas' DataFrame
-    df = pd.DataFrame([cert.properties for cert in certs], columns=list(Headers))
-    df[Headers.DAYS] = (df[Headers.AFTER] - df[Headers.BEFORE]).dt.days
+        fg.print_dim(f'{len(leaves)} chains, {broken} broken')
+        exit(1 if broken else 0)
+
+    # Create the table
+    if args.pandas or len(certs) >= PANDAS_ROWS:
+        table = PandasTable.from_rows(cert.properties for cert in certs)
+    else:
+        table = Table.from_rows(cert.properties for cert in certs)
 
     if args.search:
         # Limit to certificates matching the search string
         if isinstance(args.search, str):
-            df = df[df[Headers.SUBJECT].str.contains(args.search, case=False)]
+            table = table.search(Headers.SUBJECT, args.search)
         # Filter a single certificate out using fzf
         else:
             fzf = (
@@ -324,7 +861,7 @@ def main():
             try:
                 proc = run(
                     fzf,
-                    input='\n'.join(df[Headers.SUBJECT].unique()),
+                    input='\n'.join(table.unique(Headers.SUBJECT)),
                     stdout=PIPE,
                     text=True,
                 )
@@ -333,36 +870,18 @@ def main():
 
             if proc.returncode == 0:
                 res = proc.stdout.strip()
-                df = df[df[Headers.SUBJECT] == res]
+                table = table.equal(Headers.SUBJECT, res)
             else:
                 exit(proc.returncode)
 
     # this needs to come before --sort,
     # in order not to sort by fields we decide to omit with -f
-    if args.fields:
-        if not all(0 <= f < len(df.columns) for f in args.fields):
-            fg.abort(f'field limits:{fg.res} 1 <= ... <= {len(df.columns)}')
-        df = df.iloc[:, args.fields]
-    elif not args.all:
-        df = df.loc[
-            :,
-            [
-                Headers.SUBJECT,
-                Headers.ISSUER,
-                Headers.BEFORE,
-                Headers.AFTER,
-                Headers.DAYS,
-                Headers.FILE,
-            ],
-        ]
+    table = table.select(headers)
 
     # --expiring-soon
     if args.expiring_soon:
         try:
-            df = df[
-                (Expiry.EXPIRED <= df[Headers.DAYS])
-                & (df[Headers.DAYS] <= Expiry.WARNING)
-            ]
+            table = table.expiring()
         except KeyError:
             fg.abort('"days" field missing')
 
@@ -370,78 +889,40 @@ def main():
     #     keep original order of bundled certificates, else:
 
     # --sort
-    if args.sort or not args.inode.is_file():
+    if args.sort or folders or not args.inode.is_file():
         if args.sort:
             sort = [h for h in Headers if h.name == args.sort.upper()][0]
+        elif folders:
+            sort = Headers.AFTER  # expiry report
         else:
             sort = Headers.SUBJECT
 
         try:
-            if sort in (Headers.BEFORE, Headers.AFTER, Headers.DAYS):
-                df.sort_values(by=sort, inplace=True)
-            elif sort in (Headers.SERIAL, Headers.FINGERPRINT):
-                df.sort_values(
-                    by=sort, inplace=True, key=lambda col: col.apply(int, base=16)
-                )
-            else:
-                # ignore case: treat uppercase same as lowercase letters
-                df.sort_values(by=sort, inplace=True, key=lambda col: col.str.lower())
+            table = table.sort(sort)
         except KeyError:
             fg.info(args.debug, f'sort field missing:{fg.res} {sort.name.lower()}')
 
     # Result
-    if not df.empty:
-        # Format nicely before output
-        dt_fmt = '%d %b %Y %H:%S'  # dd mmm yyyy hh:ss
-
-        def _dt_split(stamp: str) -> str:
-            """Normal display for day/month/year, dimmed display for hour:seconds"""
-            date, time = stamp.rsplit(None, 1)
-            return f'{date}{fg.dim} {time}{fg.res}'
-
-        def _days_color(days: int) -> str:
-            if days < Expiry.EXPIRED:
-                color = fg.dim
-            elif days <= Expiry.ALERT:
-                color = fg.red
-            elif days <= Expiry.WARNING:
-                color = fg.yel
-            else:  # valid
-                color = fg.grn
-
-            return color + str(days) + fg.res
-
-        def _format_date(date):
-            if date in df.columns:
-                df[date] = pd.to_datetime(df[date]).dt.strftime(dt_fmt).apply(_dt_split)
-
-        _format_date(Headers.BEFORE)
-        _format_date(Headers.AFTER)
-
-        if Headers.DAYS in df.columns:
-            df[Headers.DAYS] = df[Headers.DAYS].apply(_days_color)
-
-        if Headers.FILE in df.columns:
-            df[Headers.FILE] = df[Headers.FILE].apply(lambda f: fg.cya + f + fg.res)
+    if len(table):
+        table = table.formatted()
+        headers = table.headers
+        rows = table.rows()
 
         # For a single certificate, display info vertically, else show a table
-        if df.shape[0] == 1:
-            df.columns = (f'{col}:' for col in df.columns)  # add a :
-
+        if len(rows) == 1:
             certs = tabulate(
-                df.transpose(),
+                [(f'{h}:', v) for h, v in zip(headers, rows[0])],  # add a :
                 disable_numparse=True,
                 colalign=('right', 'left'),
                 tablefmt='plain',
             )
         else:
             certs = tabulate(
-                df,
-                headers=df.columns,
+                rows,
+                headers=headers,
                 disable_numparse=True,
-                showindex=False,
                 tablefmt='grid'
-                if any(h in df.columns for h in (Headers.SAN, Headers.ISAN))
+                if any(h in headers for h in (Headers.SAN, Headers.ISAN))
                 else 'simple',
             )
 
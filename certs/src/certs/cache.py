@@ -0,0 +1,87 @@
+"""Parsed certificates, cached on disk"""
+
+import json
+import os
+import sqlite3
+from pathlib import Path
+
+cache_dir = Path(os.environ.get('XDG_CACHE_HOME', Path.home() / '.cache'), 'certs')
+
+
+class Cache:
+    """Certificate values per file, valid as long as its mtime and size are
+
+    A file that couldn't be parsed is cached too (no values), so that it
+    doesn't get read again either.
+
+    Attributes:
+        file: sqlite database
+    """
+
+    version = 2  # of the stored values, older caches get dropped
+    batch = 1000  # updates written at once
+
+    def __init__(self, file: Path = cache_dir / 'certs.sqlite'):
+        file.parent.mkdir(parents=True, exist_ok=True)
+
+        self._db = sqlite3.connect(file)
+        if self._db.execute('PRAGMA user_version').fetchone()[0] != self.version:
+            self._db.executescript(
+                f"""
+                DROP TABLE IF EXISTS certs;
+                CREATE TABLE certs (
+                    path TEXT PRIMARY KEY,
+                    mtime INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    cert_values TEXT
+                );
+                PRAGMA user_version = {self.version};
+                """
+            )
+
+        self._updates: list[tuple] = []
+
+    def get(self, file: Path, st: os.stat_result) -> dict | None | bool:
+        """Returns values for file, None if it isn't a certificate
+
+        False if missing or stale
+        """
+        row = self._db.execute(
+            'SELECT cert_values FROM certs WHERE path = ? AND mtime = ? AND size = ?',
+            (os.path.abspath(file), st.st_mtime_ns, st.st_size),
+        ).fetchone()
+
+        if row is None:
+            return False
+
+        return json.loads(row[0]) if row[0] else None
+
+    def put(self, file: Path, st: os.stat_result, values: dict | None) -> None:
+        """Cache values for file (as it was when stat()ed), written by save()
+
+        or once batch updates are pending
+        """
+        self._updates.append(
+            (
+                os.path.abspath(file),
+                st.st_mtime_ns,
+                st.st_size,
+                json.dumps(values) if values else None,
+            )
+        )
+        if len(self._updates) >= self.batch:
+            self.save()
+
+    def save(self) -> None:
+        try:
+            with self._db:
+                self._db.executemany(
+                    'INSERT OR REPLACE INTO certs VALUES (?, ?, ?, ?)', self._updates
+                )
+        except sqlite3.Error:
+            pass  # e.g. locked by another run, files get parsed again next time
+        self._updates = []
+
+    def close(self) -> None:
+        self.save()
+        self._db.close()
@@ -0,0 +1,111 @@
+"""Certificate chains, from leaves up to roots
+
+Issuers are looked up in hash indexes rather than by comparing certificates
+pairwise: by authority key identifier (AKI -> SKI) when there is one, by
+issuer DN (-> subject DN) otherwise. Chains share their upper links, which
+get resolved once, so that building all chains is linear in certificates.
+"""
+
+from enum import StrEnum
+from typing import TYPE_CHECKING, Iterable
+
+if TYPE_CHECKING:
+    from . import Cert
+
+
+class Status(StrEnum):
+    COMPLETE = 'complete'  # up to a self-signed root
+    INCOMPLETE = 'issuer missing'  # up to a certificate whose issuer wasn't loaded
+    LOOP = 'loop'  # issuers cross-signing each other, without a root
+
+
+class Chains:
+    """Issuer indexes over certificates
+
+    Attributes:
+        certs: certificates, in the order they were loaded
+    """
+
+    def __init__(self, certs: Iterable['Cert']):
+        self.certs = list(certs)
+
+        self._by_ski: dict[str, list['Cert']] = {}
+        self._by_subject: dict[str, list['Cert']] = {}
+        indexed = set()  # fingerprints, a certificate may be in several files
+        for cert in self.certs:
+            if cert.fingerprint in indexed:
+                continue
+            indexed.add(cert.fingerprint)
+            if cert.ski:
+                self._by_ski.setdefault(cert.ski, []).append(cert)
+            self._by_subject.setdefault(cert.subject_dn, []).append(cert)
+
+        # Cert -> (its chain up to the root, Status), see chain()
+        self._chains: dict['Cert', tuple[list['Cert'], Status]] = {}
+
+    @staticmethod
+    def self_signed(cert: 'Cert') -> bool:
+        return cert.subject_dn == cert.issuer_dn and (
+            not cert.aki or not cert.ski or cert.aki == cert.ski
+        )
+
+    def issuer(self, cert: 'Cert') -> 'Cert | None':
+        """The certificate that issued cert, the latest to expire if several"""
+        if self.self_signed(cert):
+            return None
+
+        if cert.aki and cert.aki in self._by_ski:
+            issuers = self._by_ski[cert.aki]
+        else:
+            # same DN, but not a different key
+            issuers = [
+                i
+                for i in self._by_subject.get(cert.issuer_dn, ())
+                if not (cert.aki and i.ski)
+            ]
+
+        issuers = [i for i in issuers if i.fingerprint != cert.fingerprint]
+        return max(issuers, key=lambda i: i.after) if issuers else None
+
+    def chain(self, cert: 'Cert') -> tuple[list['Cert'], Status]:
+        """cert, its issuer, that issuer's issuer... and whether a root got reached"""
+        links = []
+        seen = set()
+
+        # walk up to a root, a missing issuer, a loop or an already known chain
+        while cert not in self._chains:
+            if cert in seen:
+                tail, status = [], Status.LOOP
+                break
+            seen.add(cert)
+            links.append(cert)
+
+            issuer = self.issuer(cert)
+            if issuer is None:
+                status = (
+                    Status.COMPLETE if self.self_signed(cert) else Status.INCOMPLETE
+                )
+                tail = []
+                break
+            cert = issuer
+        else:
+            tail, status = self._chains[cert]
+
+        # memoize the chain of each link walked
+        for i in range(len(links) - 1, -1, -1):
+            tail = [links[i], *tail]
+            self._chains[links[i]] = (tail, status)
+
+        return tail, status
+
+    def leaves(self) -> list['Cert']:
+        """Certificates that didn't issue any other
+
+        Roots among them (e.g. a CA bundle) are one-link complete chains
+        """
+        issuers = {
+            issuer.fingerprint
+            for cert in self.certs
+            if (issuer := self.issuer(cert)) is not None
+        }
+        return [cert for cert in self.certs if cert.fingerprint not in issuers]
@@ -0,0 +1,217 @@
+"""Certificates exported for other programs: JSON lines, CSV, binary columns
+
+Values come straight from Cert objects, without colors or date formatting.
+
+Writers take values() dicts one at a time, the output being written as they
+come, and get closed once done.
+"""
+
+import csv
+import json
+import struct
+import sys
+import zlib
+from array import array
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING, BinaryIO, TextIO
+
+from .table import Headers
+
+if TYPE_CHECKING:
+    from . import Cert
+
+
+def values(cert: 'Cert') -> dict:
+    """Headers -> raw values of a certificate, days left included"""
+    return {
+        Headers.SUBJECT: cert.subject,
+        Headers.ISSUER: cert.issuer,
+        Headers.BEFORE: cert.before,
+        Headers.AFTER: cert.after,
+        Headers.DAYS: (cert.after - cert.before).days,
+        Headers.SAN: cert.san,
+        Headers.ISAN: cert.isan,
+        Headers.IEMAIL: cert.iemail,
+        Headers.SERIAL: cert.serial,
+        Headers.FINGERPRINT: cert.fingerprint,
+        Headers.FILE: cert.inode,
+        Headers.HOST: cert.host,
+    }
+
+
+def fields(headers: list[Headers]) -> list[tuple[str, Headers, bool]]:
+    """(field name, header, is a date)..., worked out once per writer"""
+    return [(h.name.lower(), h, h in (Headers.BEFORE, Headers.AFTER)) for h in headers]
+
+
+def record(values: dict, fields: list[tuple[str, Headers, bool]]) -> dict:
+    """Field name -> JSON value, ISO 8601 dates"""
+    return {
+        name: values[h].isoformat() if date else values[h] for name, h, date in fields
+    }
+
+
+class JsonLines:
+    """A JSON object per certificate, keyed by field name"""
+
+    def __init__(self, out: TextIO, headers: list[Headers]):
+        self.out = out
+        self.headers = headers
+        self._fields = fields(headers)
+
+    def write(self, values: dict) -> None:
+        print(json.dumps(record(values, self._fields)), file=self.out, flush=True)
+
+    def close(self) -> None:
+        pass
+
+
+class Csv:
+    """Comma separated, with a header line of field names
+
+    Multiple values (e.g. SANs) are separated by newlines, in quoted cells
+    """
+
+    def __init__(self, out: TextIO, headers: list[Headers]):
+        self.out = out
+        self.headers = headers
+        self._fields = fields(headers)
+        self._csv = csv.writer(out)
+        self._csv.writerow(name for name, _, _ in self._fields)
+
+    def write(self, values: dict) -> None:
+        self._csv.writerow(record(values, self._fields).values())
+        self.out.flush()
+
+    def close(self) -> None:
+        pass
+
+
+class Columns:
+    """Binary columns, in zlib compressed blocks of rows
+
+    Layout, little-endian:
+        magic, field count (u16), field names (u16 length, utf-8)...
+        blocks: compressed size (u32), zlib(row count (u32), columns...)
+        end: compressed size 0
+
+    Columns by field:
+        dates: epoch seconds (i64), days left: i32
+        SHA1 fingerprint: 20 bytes per row
+        other strings: dictionary of unique values (u32 count, u32 lengths,
+        utf-8), then each row's index in it (u32)
+
+    See read_columns
+    """
+
+    magic = b'CERTCOL1'
+    block = 65_536  # rows
+
+    def __init__(self, out: BinaryIO, headers: list[Headers]):
+        self.out = out
+        self.headers = headers
+        self._rows: list[dict] = []
+
+        out.write(self.magic + struct.pack('<H', len(headers)))
+        for h in headers:
+            name = h.name.lower().encode()
+            out.write(struct.pack('<H', len(name)) + name)
+
+    def write(self, values: dict) -> None:
+        self._rows.append(values)
+        if len(self._rows) >= self.block:
+            self._flush()
+
+    def close(self) -> None:
+        self._flush()
+        self.out.write(struct.pack('<I', 0))
+        self.out.flush()
+
+    def _flush(self) -> None:
+        if not self._rows:
+            return
+
+        parts = [struct.pack('<I', len(self._rows))]
+        for h in self.headers:
+            column = [values[h] for values in self._rows]
+            if h in (Headers.BEFORE, Headers.AFTER):
+                parts.append(_le(array('q', (int(d.timestamp()) for d in column))))
+            elif h == Headers.DAYS:
+                parts.append(_le(array('i', column)))
+            elif h == Headers.FINGERPRINT:
+                parts.append(bytes.fromhex(''.join(column)))
+            else:
+                unique = list(dict.fromkeys(column))
+                encoded = [v.encode() for v in unique]
+                index = {v: i for i, v in enumerate(unique)}
+                parts.append(struct.pack('<I', len(unique)))
+                parts.append(_le(array('I', map(len, encoded))))
+                parts.append(b''.join(encoded))
+                parts.append(_le(array('I', map(index.__getitem__, column))))
+
+        data = zlib.compress(b''.join(parts), 6)
+        self.out.write(struct.pack('<I', len(data)) + data)
+        self._rows = []
+
+
+def _le(numbers: array) -> bytes:
+    """Little-endian bytes of an array"""
+    if sys.byteorder == 'big':
+        numbers.byteswap()
+    return numbers.tobytes()
+
+
+def _read_array(typecode: str, data: memoryview, pos: int, count: int):
+    numbers = array(typecode)
+    end = pos + count * numbers.itemsize
+    numbers.frombytes(data[pos:end])
+    if sys.byteorder == 'big':
+        numbers.byteswap()
+    return numbers, end
+
+
+def read_columns(f: BinaryIO) -> dict[str, list]:
+    """Columns written by Columns: field name -> values"""
+    if f.read(len(Columns.magic)) != Columns.magic:
+        raise ValueError('not a certs columns file')
+
+    (count,) = struct.unpack('<H', f.read(2))
+    names = []
+    for _ in range(count):
+        (size,) = struct.unpack('<H', f.read(2))
+        names.append(f.read(size).decode())
+
+    columns = {name: [] for name in names}
+
+    while (size := struct.unpack('<I', f.read(4))[0]) != 0:
+        data = memoryview(zlib.decompress(f.read(size)))
+        (rows,) = struct.unpack_from('<I', data)
+        pos = 4
+
+        for name in names:
+            if name in ('before', 'after'):
+                stamps, pos = _read_array('q', data, pos, rows)
+                columns[name] += (datetime.fromtimestamp(s, UTC) for s in stamps)
+            elif name == 'days':
+                days, pos = _read_array('i', data, pos, rows)
+                columns[name] += days
+            elif name == 'fingerprint':
+                raw = bytes(data[pos : pos + 20 * rows])
+                columns[name] += (
+                    raw[i : i + 20].hex().upper() for i in range(0, len(raw), 20)
+                )
+                pos += 20 * rows
+            else:
+                (unique,) = struct.unpack_from('<I', data, pos)
+                lengths, pos = _read_array('I', data, pos + 4, unique)
+                strings = []
+                for length in lengths:
+                    strings.append(str(data[pos : pos + length], 'utf-8'))
+                    pos += length
+                index, pos = _read_array('I', data, pos, rows)
+                columns[name] += map(strings.__getitem__, index)
+
+    return columns
+
+
+writers = {'jsonl': JsonLines, 'csv': Csv, 'columns': Columns}
@@ -0,0 +1,150 @@
+"""Certificates written out as they get loaded, a row at a time
+
+Unlike the table, rows aren't sorted nor aligned on their contents: columns
+are either fixed-width or separated (TSV, JSON lines).
+
+Writers work like those of export, see a_stream.
+"""
+
+import re
+from datetime import datetime
+from typing import TYPE_CHECKING, AsyncIterator, TextIO
+
+from . import colors as fg
+from .export import JsonLines, values
+from .table import Expiry, Headers, days_color, dt_fmt
+
+if TYPE_CHECKING:
+    from . import Cert
+
+# fixed: column widths, longer values get cut
+widths = {
+    Headers.SUBJECT: 32,
+    Headers.ISSUER: 32,
+    Headers.BEFORE: 17,
+    Headers.AFTER: 17,
+    Headers.DAYS: 9,
+    Headers.SAN: 40,
+    Headers.ISAN: 40,
+    Headers.IEMAIL: 24,
+    Headers.SERIAL: 40,
+    Headers.FINGERPRINT: 40,
+    Headers.FILE: 40,
+    Headers.HOST: 24,
+}
+
+
+def _cut(value: str, width: int) -> str:
+    value = value.replace('\n', ',')
+    return value if len(value) <= width else value[: width - 1] + '…'
+
+
+class Fixed:
+    """Columns padded to their widths, colored as in the table
+
+    The header line gets written along with the first row
+    """
+
+    def __init__(self, out: TextIO, headers: list[Headers]):
+        self.out = out
+        self.headers = headers
+        # the last column isn't padded
+        self._pads = [widths[h] for h in headers[:-1]] + [0]
+        self._header = True
+
+    def write(self, values: dict) -> None:
+        if self._header:
+            header = '  '.join(
+                h.rjust(widths[h])
+                if h == Headers.DAYS
+                else _cut(h, widths[h]).ljust(pad)
+                for h, pad in zip(self.headers, self._pads)
+            )
+            print(fg.dim + header + fg.res, file=self.out)
+            self._header = False
+
+        cells = []
+        for h, pad in zip(self.headers, self._pads):
+            value = values[h]
+            if h in (Headers.BEFORE, Headers.AFTER):
+                cells.append(value.strftime(dt_fmt))
+            elif h == Headers.DAYS:
+                cells.append(' ' * (widths[h] - len(str(value))) + days_color(value))
+            else:
+                cell = _cut(value, widths[h])
+                padding = ' ' * (pad - len(cell))
+                if h == Headers.FILE:
+                    cell = fg.cya + cell + fg.res
+                cells.append(cell + padding)
+
+        print('  '.join(cells), file=self.out, flush=True)
+
+    def close(self) -> None:
+        pass
+
+
+class Tsv:
+    """Tab separated, without colors, ISO 8601 dates
+
+    The header line gets written along with the first row
+    """
+
+    def __init__(self, out: TextIO, headers: list[Headers]):
+        self.out = out
+        self.headers = headers
+        self._header = True
+
+    @staticmethod
+    def _cell(value) -> str:
+        if isinstance(value, str):
+            return value.replace('\n', ',').replace('\t', ' ')
+        return value.isoformat() if isinstance(value, datetime) else str(value)
+
+    def write(self, values: dict) -> None:
+        if self._header:
+            print('\t'.join(self.headers), file=self.out)
+            self._header = False
+
+        line = '\t'.join(self._cell(values[h]) for h in self.headers)
+        print(line, file=self.out, flush=True)
+
+    def close(self) -> None:
+        pass
+
+
+writers = {'fixed': Fixed, 'tsv': Tsv, 'jsonl': JsonLines}
+
+
+async def a_stream(
+    certs: AsyncIterator['Cert'],
+    writer,
+    search: str | None = None,
+    expiring: bool = False,
+) -> int:
+    """Write certificates as they come, in constant memory
+
+    Args:
+        writer: one of writers, or of export.writers
+        search: keep certificates whose Subject CN matches this regex, ignoring case
+        expiring: keep certificates nearing expiry
+
+    Returns:
+        number of certificates written
+    """
+
+    match = search and re.compile(search, re.IGNORECASE).search
+
+    written = 0
+    async for cert in certs:
+        row = values(cert)
+
+        if match and not match(row[Headers.SUBJECT]):
+            continue
+        if expiring and not Expiry.EXPIRED <= row[Headers.DAYS] <= Expiry.WARNING:
+            continue
+
+        writer.write(row)
+        written += 1
+
+    writer.close()
+    return written
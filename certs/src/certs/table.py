@@ -0,0 +1,280 @@
+"""Certificates table: filter, sort and format Cert properties
+
+Table keeps one list per column, stdlib only. PandasTable does the same
+operations with pandas, whole columns at a time, worth its import time
+for large tables only.
+"""
+
+import calendar
+import re
+from enum import IntEnum, StrEnum
+from typing import Iterable, Self
+
+from . import colors as fg
+
+
+class Expiry(IntEnum):
+    EXPIRED = 0
+    ALERT = 7  # one week
+    WARNING = 14  # two weeks
+
+
+class Headers(StrEnum):
+    SUBJECT = 'Subject CN'
+    ISSUER = 'Issuer CN'
+    BEFORE = 'From'
+    AFTER = 'To'
+    DAYS = 'Days Left'
+    SAN = 'Subject Alternative Name'
+    ISAN = 'Issuer Alternative Name'
+    IEMAIL = 'Issuer Email'
+    SERIAL = 'Serial Number'
+    FINGERPRINT = 'SHA1 Fingerprint'
+    FILE = 'File'
+    HOST = 'Host'  # --inventory
+
+
+# dd mmm yyyy, dimmed hh:ss
+dt_fmt = f'%d %b %Y{fg.dim} %H:%S{fg.res}'
+
+
+def days_color(days: int) -> str:
+    if days < Expiry.EXPIRED:
+        color = fg.dim
+    elif days <= Expiry.ALERT:
+        color = fg.red
+    elif days <= Expiry.WARNING:
+        color = fg.yel
+    else:  # valid
+        color = fg.grn
+
+    return color + str(days) + fg.res
+
+
+class Table:
+    """Certificate properties, column by column
+
+    Operations return a new Table, columns being shared when unchanged.
+    Those on a missing column raise KeyError.
+
+    Attributes:
+        columns: Headers -> values
+    """
+
+    def __init__(self, columns: dict[Headers, list]):
+        self.columns = columns
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[list]) -> Self:
+        """Table out of Cert.properties rows"""
+        columns = dict(zip(Headers, map(list, zip(*rows))))
+        if not columns:
+            columns = {h: [] for h in Headers}
+
+        columns[Headers.DAYS] = [
+            (after - before).days
+            for before, after in zip(columns[Headers.BEFORE], columns[Headers.AFTER])
+        ]
+
+        return cls(columns)
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()), ()))
+
+    @property
+    def headers(self) -> list[Headers]:
+        return list(self.columns)
+
+    def rows(self) -> list[tuple]:
+        return list(zip(*self.columns.values()))
+
+    def unique(self, header: Headers) -> list:
+        return list(dict.fromkeys(self.columns[header]))
+
+    def _keep(self, keep: Iterable[bool]) -> Self:
+        keep = list(keep)
+        return type(self)(
+            {
+                h: [v for v, k in zip(values, keep) if k]
+                for h, values in self.columns.items()
+            }
+        )
+
+    def search(self, header: Headers, pattern: str) -> Self:
+        """Rows matching a regex, ignoring case"""
+        search = re.compile(pattern, re.IGNORECASE).search
+        return self._keep(search(v) is not None for v in self.columns[header])
+
+    def equal(self, header: Headers, value) -> Self:
+        return self._keep(v == value for v in self.columns[header])
+
+    def expiring(self) -> Self:
+        """Certificates nearing expiry"""
+        return self._keep(
+            Expiry.EXPIRED <= days <= Expiry.WARNING
+            for days in self.columns[Headers.DAYS]
+        )
+
+    def select(self, headers: Iterable[Headers]) -> Self:
+        return type(self)({h: self.columns[h] for h in headers})
+
+    def sort(self, header: Headers) -> Self:
+        column = self.columns[header]
+
+        if header in (Headers.BEFORE, Headers.AFTER, Headers.DAYS):
+            keys = column
+        elif header in (Headers.SERIAL, Headers.FINGERPRINT):
+            # hex numbers without leading 0s: by length, then as strings
+            keys = [(len(v), v) for v in column]
+        else:
+            # ignore case: treat uppercase same as lowercase letters
+            keys = [v.lower() for v in column]
+
+        order = sorted(range(len(self)), key=keys.__getitem__)
+
+        return type(self)(
+            {
+                h: list(map(values.__getitem__, order))
+                for h, values in self.columns.items()
+            }
+        )
+
+    def formatted(self) -> Self:
+        """Format nicely before output"""
+        columns = self.columns.copy()
+
+        for date in (Headers.BEFORE, Headers.AFTER):
+            if date in columns:
+                columns[date] = [d.strftime(dt_fmt) for d in columns[date]]
+
+        if Headers.DAYS in columns:
+            columns[Headers.DAYS] = list(map(days_color, columns[Headers.DAYS]))
+
+        if Headers.FILE in columns:
+            columns[Headers.FILE] = [fg.cya + f + fg.res for f in columns[Headers.FILE]]
+
+        return type(self)(columns)
+
+
+class PandasTable:
+    """Table operations on a pandas DataFrame, see Table"""
+
+    def __init__(self, df):
+        self.df = df
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[list]) -> Self:
+        import pandas as pd
+
+        df = pd.DataFrame(list(rows), columns=list(Headers))
+        df[Headers.DAYS] = (df[Headers.AFTER] - df[Headers.BEFORE]).dt.days
+
+        return cls(df)
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    @property
+    def headers(self) -> list[Headers]:
+        return list(self.df.columns)
+
+    def rows(self) -> list[tuple]:
+        return list(self.df.itertuples(index=False, name=None))
+
+    def unique(self, header: Headers) -> list:
+        return list(self.df[header].unique())
+
+    def search(self, header: Headers, pattern: str) -> Self:
+        return type(self)(self.df[self.df[header].str.contains(pattern, case=False)])
+
+    def equal(self, header: Headers, value) -> Self:
+        return type(self)(self.df[self.df[header] == value])
+
+    def expiring(self) -> Self:
+        days = self.df[Headers.DAYS]
+        return type(self)(self.df[(Expiry.EXPIRED <= days) & (days <= Expiry.WARNING)])
+
+    def select(self, headers: Iterable[Headers]) -> Self:
+        return type(self)(self.df.loc[:, list(headers)])
+
+    def sort(self, header: Headers) -> Self:
+        import numpy as np
+
+        df = self.df
+
+        if header in (Headers.BEFORE, Headers.AFTER, Headers.DAYS):
+            return type(self)(df.sort_values(by=header))
+
+        if header in (Headers.SERIAL, Headers.FINGERPRINT):
+            # hex numbers without leading 0s: by length, then as strings
+            hex = df[header].to_numpy(dtype=str)
+            return type(self)(df.iloc[np.lexsort((hex, np.char.str_len(hex)))])
+
+        # ignore case: treat uppercase same as lowercase letters
+        return type(self)(df.sort_values(by=header, key=lambda col: col.str.lower()))
+
+    def formatted(self) -> Self:
+        """Format nicely before output, whole columns at a time"""
+        import numpy as np
+
+        df = self.df.copy()
+
+        for date in (Headers.BEFORE, Headers.AFTER):
+            if date in df.columns:
+                df[date] = format_dates(df[date])
+
+        if Headers.DAYS in df.columns:
+            days = df[Headers.DAYS]
+            color = np.select(
+                [days < Expiry.EXPIRED, days <= Expiry.ALERT, days <= Expiry.WARNING],
+                [fg.dim, fg.red, fg.yel],
+                default=fg.grn,  # valid
+            )
+            df[Headers.DAYS] = color + days.astype(str) + fg.res
+
+        if Headers.FILE in df.columns:
+            df[Headers.FILE] = fg.cya + df[Headers.FILE] + fg.res
+
+        return type(self)(df)
+
+
+def format_dates(dates):
+    """dt_fmt for a pandas Series of dates
+
+    Same as .dt.strftime(dt_fmt), only faster:
+    ISO dates get split into characters, rearranged as whole columns
+    """
+    import numpy as np
+    import pandas as pd
+
+    if dates.empty:
+        return dates
+
+    def chars(text: str):
+        return np.broadcast_to(np.array(list(text)), (len(dates), len(text)))
+
+    months = np.array([list(month) for month in calendar.month_abbr[1:]])
+
+    stamps = pd.to_datetime(dates, utc=True).dt.tz_convert(None).to_numpy()
+    iso = np.datetime_as_string(stamps, unit='s').view('U1').reshape(len(dates), -1)
+    month = stamps.astype('M8[M]').astype(int) % 12
+
+    formatted = np.concatenate(
+        [
+            iso[:, 8:10],  # dd
+            chars(' '),
+            months[month],
+            chars(' '),
+            iso[:, :4],  # yyyy
+            chars(f'{fg.dim} '),
+            iso[:, 11:13],  # hh
+            chars(':'),
+            iso[:, 17:19],  # ss
+            chars(fg.res),
+        ],
+        axis=1,
+    )
+
+    return pd.Series(
+        formatted.view(f'U{formatted.shape[1]}').ravel(), index=dates.index
+    )
@@ -0,0 +1,96 @@
+"""
+History parsing micro-benchmark: lines/sec over a synthetic 1M-line history
+
+The previous multi-regex extraction is kept here as a baseline.
+
+uv run python benchmarks/parse.py [LINES]
+"""
+
+import random
+import re
+import sys
+import time
+from pathlib import PurePath
+
+from c import CDPaths
+
+
+start = '(?:(?:builtin|command) +)?'
+dir_dash_re = re.compile(start + 'cd +-\\d*')
+dir_dots_re = re.compile(start + 'cd +[./]+')
+cd_re = re.compile(start + '(cd .+)')
+extended_re = re.compile(': *(\\d+):\\d+;(.*)', re.DOTALL)
+
+
+def legacy_parse(line: str) -> tuple[str | None, int | None]:
+    """cd-line extraction prior to the combined regex"""
+    timestamp = None
+    match = extended_re.match(line)
+    if match:
+        line, timestamp = match.group(2), int(match.group(1))
+
+    entry = line.strip()
+
+    if dir_dash_re.fullmatch(entry) or dir_dots_re.fullmatch(entry):
+        return None, timestamp
+
+    match = cd_re.match(entry)
+    if match:
+        dir = match.group(1).split('&&', 1)[0].split(None, 1)[1].rstrip()
+        if dir.startswith('-- '):
+            dir = dir.split('--', 1)[1].lstrip()
+        dir = dir.strip('\'"').replace('\\ ', ' ')
+        if all(exc not in PurePath(dir).parts for exc in CDPaths.excluded):
+            return dir, timestamp
+
+    return None, timestamp
+
+
+def history(size: int) -> list[str]:
+    random.seed(0)
+
+    commands = [
+        'ls -l',
+        'git status',
+        'vim ~/.zshrc',
+        'rg -i todo src/',
+        'make -j8 && make install',
+    ]
+    cds = [
+        'cd /usr/local/share',
+        'cd ~/repos/scripts && git pull',
+        'builtin cd "/mnt/my disk"',
+        'cd My\\ Documents',
+        'cd -- -weird-',
+        'cd -2',
+        'cd ../..',
+        'cd ~/repos/scripts/.git',
+    ]
+
+    stamp = 1_700_000_000
+    lines = []
+    for _ in range(size):
+        stamp += random.randint(1, 300)
+        cmd = random.choice(cds if random.random() < 0.2 else commands)
+        lines.append(f': {stamp}:0;{cmd}\n')
+
+    return lines
+
+
+def bench(name: str, parse, lines: list[str]) -> float:
+    start = time.perf_counter()
+    for line in lines:
+        parse(line)
+    elapsed = time.perf_counter() - start
+
+    print(f'{name:>8}: {len(lines) / elapsed:>12,.0f} lines/sec')
+    return elapsed
+
+
+if __name__ == '__main__':
+    lines = history(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
+
+    legacy = bench('legacy', legacy_parse, lines)
+    current = bench('current', CDPaths.parse, lines)
+
+    print(f'{"speedup":>8}: {legacy / current:.2f}x')
@@ -0,0 +1,63 @@
+"""
+c QUERY benchmark: built-in Query matcher vs an fzf subprocess
+
+The fzf side runs in filter mode (fzf -f), i.e. the cost of starting fzf,
+piping the ranked paths and reading the result back.
+
+uv run python benchmarks/query.py [PATHS] [QUERY]
+"""
+
+import random
+import shutil
+import sys
+import time
+from subprocess import PIPE, run
+
+from c import Query
+
+ROUNDS = 20
+
+
+def ranked_paths(size: int) -> list[str]:
+    random.seed(0)
+
+    parts = ['repos', 'scripts', 'src', 'docs', 'music', 'photos', 'work', 'tmp']
+    paths = {
+        '~/' + '/'.join(random.choices(parts, k=random.randint(1, 5)))
+        for _ in range(size)
+    }
+
+    return [*sorted(paths), '~/repos/kurkale6ka/unique-target']
+
+
+def bench(name: str, select, paths: list[str], query: str) -> float:
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        selected = select(paths, query)
+    elapsed = (time.perf_counter() - start) / ROUNDS
+
+    print(f'{name:>8}: {elapsed * 1000:>8.2f} ms  ({selected})')
+    return elapsed
+
+
+def builtin(paths: list[str], query: str) -> list[str]:
+    return Query(query).filter(paths, limit=2)
+
+
+def fzf(paths: list[str], query: str) -> list[str]:
+    proc = run(['fzf', '-f', query], input='\n'.join(paths), stdout=PIPE, text=True)
+    return proc.stdout.splitlines()
+
+
+if __name__ == '__main__':
+    paths = ranked_paths(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
+    query = sys.argv[2] if len(sys.argv) > 2 else 'uniqtarg'
+
+    print(f'{len(paths)} paths, query: {query}')
+    current = bench('builtin', builtin, paths, query)
+
+    if shutil.which('fzf'):
+        subprocess = bench('fzf', fzf, paths, query)
+        print(f'{"speedup":>8}: {subprocess / current:.1f}x')
+    else:
+        print('fzf missing, skipping the subprocess side')
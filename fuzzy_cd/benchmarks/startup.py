@@ -0,0 +1,69 @@
+"""
+c startup budget: cumulative import time of the modules a plain c call
+imports, c and its daemon client
+
+Measured with python -X importtime, best of a few runs with bytecode cached
+as in an installed package. Exits non-zero if over budget or if a module only
+needed by --stats/--view-cds/--cleanup/--daemon, or by several unindexed
+history files, gets imported on the plain c path.
+
+uv run python benchmarks/startup.py [BUDGET_MS]
+"""
+
+import os
+import re
+import sys
+import tempfile
+from subprocess import PIPE, run
+
+ROUNDS = 5
+
+# not needed to rank paths
+lazy = ('tabulate', 'concurrent.futures', 'tempfile', 'hashlib', 'socketserver')
+
+import_re = re.compile(
+    r'import time: +\d+ \| +(?P<cumulative>\d+) \| (?P<module> *[\w.]+)'
+)
+
+
+def import_times(pycache: str, code: str = 'import c, c.client') -> dict[str, int]:
+    """Cumulative import time in microseconds per module, python -X importtime"""
+    env = os.environ | {'PYTHONPYCACHEPREFIX': pycache}
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+
+    proc = run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        env=env,
+        stderr=PIPE,
+        text=True,
+        check=True,
+    )
+
+    return {
+        match['module'].strip(): int(match['cumulative'])
+        for match in import_re.finditer(proc.stderr)
+    }
+
+
+if __name__ == '__main__':
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    with tempfile.TemporaryDirectory() as pycache:
+        import_times(pycache)  # compile
+        runs = [import_times(pycache) for _ in range(ROUNDS)]
+        # imported by the interpreter itself: site, .pth files
+        python = import_times(pycache, 'pass')
+    elapsed = min(times['c'] + times['c.client'] for times in runs) / 1000
+
+    print(f'import c, c.client: {elapsed:.1f} ms (budget: {budget:.0f} ms)')
+
+    errors = []
+    if elapsed > budget:
+        errors.append(f'over budget by {elapsed - budget:.1f} ms')
+
+    for module in lazy:
+        if module in runs[0] and module not in python:
+            errors.append(f'{module} imported at startup')
+
+    if errors:
+        exit('\n'.join(errors))
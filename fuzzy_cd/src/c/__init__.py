@@ -3,155 +3,1251 @@ Fuzzy cd, using shell's history
 """
 
 import argparse
+import atexit
+import fcntl
+import functools
+import itertools
+import json
 import operator
 import os
 import re
+import stat
+import sys
+import time
+from array import array
 from collections import Counter
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from contextlib import contextmanager
 from os import environ as env
-from pathlib import Path, PurePath
+from pathlib import Path
 from subprocess import PIPE, run
-
-from tabulate import tabulate
+from typing import BinaryIO, TextIO
 
 File = str | os.PathLike
 
+# history lines -> ('cd' path or None, timestamp or None) for each entry
+Records = Callable[[Iterable[str]], Iterator[tuple[str | None, int | None]]]
+
+cache_dir = Path(env.get('XDG_CACHE_HOME', Path.home() / '.cache'), 'fuzzy_cd')
+
+
+class Profile:
+    """Opt-in wall time of each phase of c, plus counters (--profile, C_PROFILE)
+
+    Reported on stderr when c exits, as a table or JSON (for dashboards).
+    Disabled, phase() and count() return straight away.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.json = False
+        self.phases: dict[str, float] = {}
+        self.counters: Counter[str] = Counter()
+
+    def start(self, fmt: str) -> None:
+        self.enabled = True
+        self.json = fmt == 'json'
+        atexit.register(self.report)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0) + time.perf_counter() - start
+
+    def count(self, name: str, n: int = 1) -> None:
+        if self.enabled:
+            self.counters[name] += n
+
+    def report(self) -> None:
+        phases = {name: round(t * 1000, 3) for (name, t) in self.phases.items()}
+
+        if self.json:
+            print(
+                json.dumps({'phases_ms': phases, 'counters': self.counters}),
+                file=sys.stderr,
+            )
+        else:
+            width = max(map(len, [*phases, *self.counters]), default=0)
+            for name, ms in phases.items():
+                print(f'{name:>{width}}: {ms:.3f} ms', file=sys.stderr)
+            for name, n in self.counters.items():
+                print(f'{name:>{width}}: {n}', file=sys.stderr)
+
+
+profile = Profile()
+
+
+def cache_key(*histfiles: File) -> str:
+    """File name part for cached data about history files
+
+    The escaped paths themselves, hashed only when too long for a file name:
+    importing hashlib costs more than a plain c run should.
+    """
+    key = '+'.join(
+        os.fspath(h).replace('%', '%25').replace('/', '%') for h in histfiles
+    )
+
+    if len(key) > 200:
+        import hashlib
+
+        key = hashlib.sha1(key.encode()).hexdigest()[:16]
+
+    return key
+
+
+def write_cache(path: Path, text: str) -> None:
+    """Atomically replace a cache file, silently giving up on errors
+
+    The temporary file is named after the whole file name and the process:
+    cache files sharing a stem, or concurrent c runs, don't clash.
+    """
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp, 'w') as file:
+            file.write(text)
+        os.replace(tmp, path)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+
+
+def tabulate(*args, **kwargs) -> str:
+    """tabulate, imported on first use
+
+    Only --stats, --view-cds and --cleanup need it, not plain c calls
+    """
+    with profile.phase('tabulate import'):
+        from tabulate import tabulate
+
+    return tabulate(*args, **kwargs)
+
+
+class Ranking:
+    """'cd' paths ranked by frecency: frequency + recency of visits
+
+    Each visit weighs 2^((stamp - anchor) / half_life), i.e. half as much
+    every half_life. Scores being relative to a fixed anchor, the order of
+    paths doesn't change with time, only the scale of scores does (scale()),
+    so the ranking can be computed once and stored.
+
+    Paths are interned: each unique path gets an id, an index into the
+    names list and the counts/scores/lasts columns. Memory per path stays
+    the same however many times it appears in history.
+
+    Attributes:
+        names: path of each id
+        counts, scores: visits and frecency score of each id
+        lasts: timestamp of the last visit of each id, 0 if unknown
+            (history without timestamps)
+        parsed, hits: history entries parsed, 'cd' entries among them (this run)
+    """
+
+    def __init__(
+        self,
+        anchor: float,
+        half_life: float,
+        names: Iterable[str] = (),
+        counts: Iterable[int] = (),
+        scores: Iterable[float] = (),
+        lasts: Iterable[float] = (),
+    ) -> None:
+        self.anchor = anchor
+        self.half_life = half_life
+        self.names: list[str] = list(names)
+        self.counts = array('L', counts)
+        self.scores = array('d', scores)
+        self.lasts = array('d', lasts)
+        self._ids = {name: id for id, name in enumerate(self.names)}
+        self.parsed = 0
+        self.hits = 0
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self) -> Iterator[tuple[str, int, float]]:
+        """path, count, score for each path"""
+        return zip(self.names, self.counts, self.scores)
+
+    def _id(self, path: str) -> int:
+        id = self._ids.get(path)
+        if id is None:
+            id = self._ids[path] = len(self.names)
+            self.names.append(path)
+            self.counts.append(0)
+            self.scores.append(0.0)
+            self.lasts.append(0.0)
+        return id
+
+    def add(self, path: str, stamp: float, timed: bool = True) -> None:
+        """A visit at stamp, timed: stamp comes from the history"""
+        id = self._id(path)
+        self.counts[id] += 1
+        self.scores[id] += 2 ** ((stamp - self.anchor) / self.half_life)
+        if timed:
+            self.lasts[id] = max(self.lasts[id], stamp)
+
+    def merge(self, other: 'Ranking') -> None:
+        """Add the visits of another ranking, e.g. another shell's history"""
+        scale = 2 ** ((other.anchor - self.anchor) / self.half_life)
+
+        for path, count, score, last in zip(
+            other.names, other.counts, other.scores, other.lasts
+        ):
+            id = self._id(path)
+            self.counts[id] += count
+            self.scores[id] += score * scale
+            self.lasts[id] = max(self.lasts[id], last)
+
+        self.parsed += other.parsed
+        self.hits += other.hits
+
+    def rank(self) -> None:
+        """Order paths from the highest score down, ids get renumbered"""
+        self._select(
+            sorted(range(len(self)), key=self.scores.__getitem__, reverse=True)
+        )
+
+    def prune(self, keep: int, since: float) -> None:
+        """Drop all but the top keep paths, and those visited since then
+
+        Must be ranked.
+        """
+        self._select(
+            [id for id in range(len(self)) if id < keep or self.lasts[id] >= since]
+        )
+
+    def _select(self, ids: list[int]) -> None:
+        """Keep these ids only, renumbered in this order"""
+        self.names = [self.names[id] for id in ids]
+        self.counts = array('L', map(self.counts.__getitem__, ids))
+        self.scores = array('d', map(self.scores.__getitem__, ids))
+        self.lasts = array('d', map(self.lasts.__getitem__, ids))
+        self._ids = {name: id for id, name in enumerate(self.names)}
+
+    def scale(self, now: float) -> float:
+        """Multiplier turning stored scores into scores at time now"""
+        return 2 ** ((self.anchor - now) / self.half_life)
+
+
+class HistIndex:
+    """On-disk index of the 'cd' paths found in a history file
+
+    Remember how far the history was parsed (byte offset), the inode and size
+    of the file at that point, plus the accumulated Ranking.
+    Only lines appended since then get parsed on the next run.
+
+    A history file that was replaced, shrank or got rewritten (c --cleanup)
+    is parsed again in full.
+
+    A compacted index (c --compact) only keeps the top ranked paths plus
+    those visited recently, pruning again after each update: its size stays
+    the same however old the history gets. Visits before the first timestamp
+    (all of them without timestamps) count as old.
+    """
+
+    version = 6
+    tail_size = 64  # bytes before offset used to detect rewrites
+
+    def __init__(self, histfile: File, half_life: float) -> None:
+        self._histfile = Path(histfile).absolute()
+        self._half_life = half_life
+
+        self._file = cache_dir / f'index-{cache_key(self._histfile)}.json'
+
+    def _read(self) -> dict:
+        try:
+            with open(self._file) as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+        if (
+            index.get('version') != self.version
+            or index.get('half_life') != self._half_life
+        ):
+            return {}
+
+        return index
+
+    def _stale(self, index: dict, st: os.stat_result, file: BinaryIO) -> bool:
+        """Whether the history must be parsed again in full"""
+        return (
+            not index
+            or index['inode'] != st.st_ino
+            or index['size'] > st.st_size
+            or self._tail(file, index['offset']) != index['tail']
+        )
+
+    def unparsed(self) -> int:
+        """Bytes of history the next load() parses, e.g. all of them if stale"""
+        st = os.stat(self._histfile)
+        index = self._read()
+
+        with open(self._histfile, 'rb') as file:
+            if self._stale(index, st, file):
+                return st.st_size
+
+        return st.st_size - index['offset']
+
+    def load(self, records: Records, compact: Sequence | None = None) -> Ranking:
+        """Returns the ranked 'cd' paths, parsing appended lines only
+
+        Args:
+            records: history lines -> ('cd' path or None, timestamp or None)...
+            compact: (keep, window) compact the index to the top keep paths
+                plus those visited within window seconds, from now on.
+                keep 0 stops compacting, parsing the whole history again
+        """
+        st = os.stat(self._histfile)
+        index = self._read()
+
+        if compact is None:
+            compact = index.get('compact')
+        elif compact[0] == 0:
+            if index.get('compact'):
+                index = {}  # pruned paths are gone, start over
+            compact = None
+        else:
+            compact = list(compact)  # as stored in json
+
+        with open(self._histfile, 'rb') as file:
+            offset = index.get('offset', 0)
+
+            if self._stale(index, st, file):  # full rebuild
+                now = time.time()
+                index = {
+                    'version': self.version,
+                    'half_life': self._half_life,
+                    'anchor': now,
+                    'stamp': now,
+                    'timed': False,
+                    'names': [],
+                    'counts': [],
+                    'scores': [],
+                    'lasts': [],
+                }
+                offset = 0
+
+            ranking = Ranking(
+                index['anchor'],
+                self._half_life,
+                index['names'],
+                index['counts'],
+                index['scores'],
+                index['lasts'],
+            )
+
+            if index.get('size') == st.st_size and index.get('compact') == compact:
+                return ranking
+
+            # entries without a timestamp inherit the last one seen, if any
+            stamp = index['stamp']
+            timed = index['timed']
+
+            def lines() -> Iterator[str]:
+                nonlocal offset
+
+                file.seek(offset)
+                for line in file:
+                    # being written by the shell, parse it next time
+                    if not line.endswith(b'\n'):
+                        break
+
+                    offset += len(line)
+                    yield line.decode(errors='replace')
+
+            for dir, timestamp in records(lines()):
+                ranking.parsed += 1
+                if timestamp is not None:
+                    stamp = timestamp
+                    timed = True
+                if dir is not None:
+                    ranking.hits += 1
+                    ranking.add(dir, stamp, timed)
+
+            ranking.rank()
+
+            if compact:
+                keep, window = compact
+                ranking.prune(keep, time.time() - window)
+
+            index.update(
+                compact=compact,
+                inode=st.st_ino,
+                size=st.st_size,
+                offset=offset,
+                tail=self._tail(file, offset),
+                stamp=stamp,
+                timed=timed,
+                names=ranking.names,
+                counts=ranking.counts.tolist(),
+                scores=ranking.scores.tolist(),
+                lasts=ranking.lasts.tolist(),
+            )
+
+        # failing that, the next run parses the whole history again
+        write_cache(self._file, json.dumps(index))
+
+        return ranking
+
+    def _tail(self, file: BinaryIO, offset: int) -> str:
+        """Bytes preceding offset, they change if the history gets rewritten"""
+        start = max(0, offset - self.tail_size)
+        file.seek(start)
+        return file.read(offset - start).hex()
+
+
+class StatCache:
+    """Directory checks, cached for ttl seconds
+
+    Results are kept under cache_dir, so that consecutive runs don't stat()
+    the same (possibly NFS mounted) directories again.
+
+    Attributes:
+        lookups: checks requested, weighted by the number of history entries
+        calls: actual stat() calls
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self._ttl = ttl
+        self._file = cache_dir / 'stat.json'
+        self._changed = False
+
+        self.lookups = 0
+        self.calls = 0
+
+        self._stats: dict[str, list] = {}
+        if ttl > 0:
+            try:
+                with open(self._file) as file:
+                    self._stats = json.load(file)
+            except (OSError, ValueError):
+                pass
+
+    def dir_id(self, path: Path, weight: int = 1) -> tuple[int, int] | None:
+        """Returns (device, inode) for a directory, None if path isn't one"""
+        self.lookups += weight
+
+        key = os.fspath(path)
+        entry = self._stats.get(key)
+        now = time.time()
+
+        # entry: [checked at, device, inode] or [checked at] for non directories
+        if entry is None or now - entry[0] >= self._ttl:
+            self.calls += 1
+            try:
+                st = os.stat(path)
+            except OSError:
+                entry = [now]
+            else:
+                if stat.S_ISDIR(st.st_mode):
+                    entry = [now, st.st_dev, st.st_ino]
+                else:
+                    entry = [now]
+
+            self._stats[key] = entry
+            self._changed = True
+
+        return (entry[1], entry[2]) if len(entry) == 3 else None
+
+    def is_dir(self, path: Path, weight: int = 1) -> bool:
+        return self.dir_id(path, weight) is not None
+
+    def save(self) -> None:
+        if self._ttl > 0 and self._changed:
+            now = time.time()
+            self._stats = {
+                k: v for (k, v) in self._stats.items() if now - v[0] < self._ttl
+            }
+            write_cache(self._file, json.dumps(self._stats))
+            self._changed = False
+
+
+class FzfCache:
+    """fzf input: ranked paths, cached until the histories change
+
+    Keyed on the fingerprint of the history files (inode, size, mtime),
+    plus PWD when relative paths made the ranking depend on it.
+    Entries expire with the directory checks they are based on (ttl).
+    """
+
+    def __init__(self, histfiles: Sequence[File], ttl: float) -> None:
+        self._histfiles = [os.path.abspath(histfile) for histfile in histfiles]
+        self._ttl = ttl
+
+        key = cache_key(*self._histfiles)
+        self._file = cache_dir / f'fzf-{key}.txt'
+        self._meta = cache_dir / f'fzf-{key}.json'
+
+        # cache up to date with the histories (opened or written)
+        self._current = False
+
+    def _fingerprint(self) -> list[list[int]]:
+        return [
+            [st.st_ino, st.st_size, st.st_mtime_ns]
+            for st in map(os.stat, self._histfiles)
+        ]
+
+    def open(self, pwd: str) -> BinaryIO | None:
+        """Cached fzf input, None if missing or stale"""
+        try:
+            with open(self._meta) as file:
+                meta = json.load(file)
+
+            if (
+                time.time() - meta['time'] < self._ttl
+                and meta['pwd'] in (None, pwd)
+                and meta['fingerprint'] == self._fingerprint()
+            ):
+                cached = open(self._file, 'rb')
+                self._current = True
+                return cached
+        except (OSError, ValueError, KeyError):
+            pass
+
+        return None
+
+    def write(self, paths: str, pwd: str | None) -> None:
+        """Cache paths, pwd: None if they don't depend on it"""
+        meta = {'time': time.time(), 'pwd': pwd, 'fingerprint': self._fingerprint()}
+        write_cache(self._file, paths)
+        write_cache(self._meta, json.dumps(meta))
+        self._current = True
+
+    def clear(self) -> None:
+        """Drop the cached paths, e.g. after the index got compacted"""
+        self._meta.unlink(missing_ok=True)
+
+    def appended(self) -> None:
+        """The history was appended by c itself, keep serving the cached paths
+
+        They catch up with the visit when the cache expires
+        """
+        if not self._current:
+            return
+
+        try:
+            with open(self._meta) as file:
+                meta = json.load(file)
+            meta['fingerprint'] = self._fingerprint()
+        except (OSError, ValueError):
+            return
+
+        write_cache(self._meta, json.dumps(meta))
+
+
+class Query:
+    """fzf search syntax subset, to match paths without starting fzf
+
+    Space separated terms, all of which must match:
+        sbtrkt    fuzzy match
+        'wild     exact match
+        ^music    prefix exact match
+        .mp3$     suffix exact match
+        ^core$    exact match of the whole path
+        !fire     inverse exact match (also !^music, !.mp3$)
+        !'fire    inverse fuzzy match
+
+    Terms get parsed in fzf's order: !, then $, then ' or ^
+    ('sbtrkt$ is an exact match, the $ dropped)
+
+    Smart case: case sensitive only if the query contains uppercase letters
+
+    Raises:
+        ValueError: syntax outside of this subset (OR operator: |,
+            exact boundary match: 'wild', ...)
+    """
+
+    def __init__(self, query: str) -> None:
+        self._case_sensitive = query != query.lower()
+        if not self._case_sensitive:
+            query = query.lower()
+
+        self._terms: list[Callable[[str], bool]] = []
+
+        for term in re.split(r'(?<!\\) +', query.strip()):
+            term = term.replace('\\ ', ' ')
+
+            if term == '|':
+                raise ValueError('OR operator')
+            if len(term) > 1 and term.startswith(("'", "!'")) and term.endswith("'"):
+                raise ValueError('exact boundary match')
+
+            kind = self._fuzzy
+            inverse = term.startswith('!')
+            if inverse:
+                kind = self._exact
+                term = term[1:]
+
+            if term != '$' and term.endswith('$'):
+                kind = self._suffix
+                term = term[:-1]
+
+            if term.startswith("'"):
+                # flips exactness
+                kind = self._fuzzy if inverse else self._exact
+                term = term[1:]
+            elif term.startswith('^'):
+                kind = self._equal if kind is self._suffix else self._prefix
+                term = term[1:]
+
+            if not term:
+                raise ValueError('empty term')
+
+            match = kind(term)
+
+            if inverse:
+                self._terms.append(lambda path, match=match: not match(path))
+            else:
+                self._terms.append(match)
+
+    @staticmethod
+    def _exact(term: str) -> Callable[[str], bool]:
+        return lambda path: term in path
+
+    @staticmethod
+    def _prefix(term: str) -> Callable[[str], bool]:
+        return lambda path: path.startswith(term)
+
+    @staticmethod
+    def _suffix(term: str) -> Callable[[str], bool]:
+        return lambda path: path.endswith(term)
+
+    @staticmethod
+    def _equal(term: str) -> Callable[[str], bool]:
+        return term.__eq__
+
+    @staticmethod
+    def _fuzzy(term: str) -> Callable[[str], bool]:
+        def match(path: str) -> bool:
+            i = 0
+            for char in term:
+                i = path.find(char, i) + 1
+                if not i:
+                    return False
+            return True
+
+        return match
+
+    def filter(self, paths: Iterable[str], limit: int | None = None) -> list[str]:
+        """Paths matching all terms, stopping after limit matches"""
+        matches = []
+
+        for path in paths:
+            text = path if self._case_sensitive else path.lower()
+            if all(match(text) for match in self._terms):
+                matches.append(path)
+                if len(matches) == limit:
+                    break
+
+        return matches
+
 
 class CDPaths:
     excluded = ['.git', '.venv']
+    stat_ttl = 60  # seconds
+    half_life = 30 * 24 * 3600  # a visit weighs half as much a month later
+    compact_keep = 1000  # c --compact: top paths kept...
+    compact_window = 90  # ...plus those visited within that many days
+    pool_size = 8 * 1024**2  # bytes of history, parsed in processes above it
 
-    def __init__(self, histfile: File) -> None:
-        """Get 'cd' lines from the shell's history file
+    # A single pass over each history line, classifying and extracting:
+    #   : 1700000000:0;cd ...  zsh EXTENDED_HISTORY timestamp
+    #   builtin cd, command cd
+    #   cd -2, cd ../..        excluded, checking the regex 'should' be faster
+    #                          than checking if -num is a dir
+    #   cd -- -hello--world
+    #   cd 'quoted', cd "quoted", cd \ escaped
+    #   cd /path && echo 1 && echo 2
+    cd_re = re.compile(
+        r"""
+        (?::\ *(?P<stamp>\d+):\d+;)?
+        \s*
+        (?:
+            (?:(?:builtin|command)\ +)?cd\ +
+            (?!(?:-\d*|[./]+)\s*(?:&&|$))
+            (?:--\ +)?
+            (?:
+                '(?P<single>[^']*)'\s*(?:&&|$)
+              | "(?P<double>[^"]*)"\s*(?:&&|$)
+              | (?P<plain>(?:\\.|[^&\\]|&(?!&))+)
+            )
+        )?
+        """,
+        re.VERBOSE | re.DOTALL,
+    )
+
+    # bash HISTTIMEFORMAT: '#<time>' line preceding the command
+    bash_stamp_re = re.compile('#(\\d+)\n?')
+
+    # cd */.venv/*, .git, ...
+    excluded_re = re.compile(
+        '(?:^|/)(?:' + '|'.join(map(re.escape, excluded)) + ')(?:/|$)'
+    )
+
+    def __init__(self, *histfiles: File, indexed: bool = False) -> None:
+        """Get 'cd' lines from the shells' history files
 
         Only interactive 'cd' usage is considered,
         'cd's within for loops or other commands are unchecked
 
-        Set a list of paths
-        Set history
+        Set paths with their number of occurences and frecency score,
+        (read from HistIndex if indexed)
+
+        Several history files (bash, zsh, fish) get their rankings merged,
+        large ones parsed concurrently when not indexed.
+        The history is streamed, only the aggregated paths are kept
+        """
+        self._histfiles = histfiles
+        self._indexed = indexed
+        with profile.phase('history'):
+            self.refresh()
+        self._stat_cache = StatCache(self.stat_ttl)
+
+        # whether get() results depend on PWD (relative paths in history)
+        self.cwd_dependent = False
+
+    @property
+    def _histfile(self) -> File:
+        """Main history: --view-cds, --cleanup"""
+        return self._histfiles[0]
+
+    def _unparsed(self) -> int:
+        """Bytes of history left to parse, see refresh()"""
+        # cheap upper bound first, indexes only read for large histories
+        size = sum(map(os.path.getsize, self._histfiles))
+        if not self._indexed or size <= self.pool_size:
+            return size
+
+        return sum(
+            HistIndex(histfile, self.half_life).unparsed()
+            for histfile in self._histfiles
+        )
+
+    def refresh(self) -> None:
+        """(Re)load paths, indexed: only lines appended since get parsed
+
+        Process startup outweighs parsing but for full parses of large
+        histories: several of them get parsed concurrently only when over
+        pool_size bytes are left to parse (no index or a stale one)
         """
+        if (
+            len(self._histfiles) > 1
+            and (os.cpu_count() or 1) > 1
+            and self._unparsed() > self.pool_size
+        ):
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(len(self._histfiles)) as pool:
+                rankings = list(
+                    pool.map(
+                        self.load,
+                        self._histfiles,
+                        itertools.repeat(self._indexed),
+                    )
+                )
+
+            ranking = rankings[0]
+            for other in rankings[1:]:
+                ranking.merge(other)
+            ranking.rank()
+        else:
+            ranking, *others = (
+                self.load(histfile, self._indexed) for histfile in self._histfiles
+            )
+            if others:
+                for other in others:
+                    ranking.merge(other)
+                ranking.rank()
+
+        self._ranking = ranking
+
+        profile.count('entries parsed', ranking.parsed)
+        profile.count('regex hits', ranking.hits)
+        profile.count('unique paths', len(ranking))
+
+    @classmethod
+    def load(cls, histfile: File, indexed: bool) -> Ranking:
+        """Rank the 'cd' paths of a single history file"""
+        records = functools.partial(cls.records, shell=cls.shell(histfile))
+
+        if indexed:
+            return HistIndex(histfile, cls.half_life).load(records)
+
+        now = time.time()
+        ranking = Ranking(now, cls.half_life)
+
         with open(histfile) as file:
-            paths = []
-            history: list[dict] = []
+            stamp, timed = now, False
+            for dir, timestamp in records(file):
+                ranking.parsed += 1
+                if timestamp is not None:
+                    stamp, timed = timestamp, True
+                if dir is not None:
+                    ranking.hits += 1
+                    ranking.add(dir, stamp, timed)
 
-            start = '(?:(?:builtin|command) +)?'
-            dir_dash_re = re.compile(start + 'cd +-\\d*')  # -num
-            dir_dots_re = re.compile(start + 'cd +[./]+')  # ../..
-            cd_re = re.compile(start + '(cd .+)')
+        ranking.rank()
 
-            for line in file:
-                history.append({'value': line})
+        return ranking
 
-                entry = line.strip()
+    @classmethod
+    def compact(cls, histfile: File, keep: int, window: float) -> Ranking:
+        """Compact the index of a history file, see HistIndex
 
-                # exclude:
-                # cd -2, checking the regex 'should' be faster than checking if -num is a dir
-                # cd ../..
-                if dir_dash_re.fullmatch(entry) or dir_dots_re.fullmatch(entry):
-                    continue
+        Args:
+            keep: top ranked paths kept, 0 to stop compacting
+            window: days, paths visited since then are kept too
+        """
+        records = functools.partial(cls.records, shell=cls.shell(histfile))
+        index = HistIndex(histfile, cls.half_life)
+
+        return index.load(records, compact=(keep, window * 24 * 3600))
+
+    @staticmethod
+    def shell(histfile: File) -> str:
+        """Guess the history format from its first line: fish, bash, zsh-extended
+        (EXTENDED_HISTORY timestamps) or zsh
+
+        zsh is assumed for bash histories without timestamps, they parse the same
+        """
+        with open(histfile, 'rb') as file:
+            first = file.readline()
+
+        if first.startswith(b'- cmd: '):
+            return 'fish'
+        if re.fullmatch(b'#\\d+\n?', first):
+            return 'bash'
+        if re.match(b': *\\d+:\\d+;', first):
+            return 'zsh-extended'
+        return 'zsh'
+
+    @staticmethod
+    def entry(cmd: str, shell: str, timestamp: int) -> str:
+        """A history entry for cmd, timestamped as the shell would"""
+        if shell == 'fish':
+            cmd = cmd.replace('\\', '\\\\')
+            return f'- cmd: {cmd}\n  when: {timestamp}\n'
+        if shell == 'bash':
+            return f'#{timestamp}\n{cmd}\n'
+        if shell == 'zsh-extended':
+            return f': {timestamp}:0;{cmd}\n'
+        return f'{cmd}\n'
+
+    @classmethod
+    def records(
+        cls, lines: Iterable[str], shell: str
+    ) -> Iterator[tuple[str | None, int | None]]:
+        """Stream ('cd' path or None, timestamp or None) entries out of history lines
+
+        Entries without a timestamp are meant to inherit the last one seen
+        """
+        if shell == 'fish':
+            # - cmd: cd /path
+            #   when: 1700000000
+            #   paths: ...
+            cmd = None
+            for line in lines:
+                if line.startswith('- cmd: '):
+                    if cmd is not None:
+                        yield cls.parse(cmd)[0], None
+                    cmd = re.sub(
+                        r'\\(.)',
+                        lambda m: '\n' if m.group(1) == 'n' else m.group(1),
+                        line[7:],
+                    )
+                elif line.startswith('  when: ') and cmd is not None:
+                    yield cls.parse(cmd)[0], int(line[8:])
+                    cmd = None
+            if cmd is not None:
+                yield cls.parse(cmd)[0], None
 
-                match = cd_re.match(entry)
+        elif shell == 'bash':
+            for line in lines:
+                match = cls.bash_stamp_re.fullmatch(line)
                 if match:
-                    cd = match.group(1)
+                    yield None, int(match.group(1))
+                else:
+                    yield cls.parse(line)
 
-                    # cd /path && echo 1 && echo 2
-                    dir = cd.split('&&', 1)[0].split(None, 1)[1].rstrip()
+        else:
+            yield from map(cls.parse, lines)
 
-                    # cd -- -hello--world
-                    if dir.startswith('-- '):
-                        dir = dir.split('--', 1)[1].lstrip()
+    @classmethod
+    def parse(cls, line: str) -> tuple[str | None, int | None]:
+        """Returns ('cd' path or None, timestamp or None) for a history line"""
+        match = cls.cd_re.match(line)
+        stamp = match.group('stamp')
+        timestamp = int(stamp) if stamp else None
 
-                    # remove quote escaped or \ escaped white spaces
-                    dir = dir.strip('\'"').replace('\\ ', ' ')
+        dir = match.group('single') or match.group('double')
+        if dir is None:
+            dir = match.group('plain')
+            if dir is None:
+                return None, timestamp
 
-                    # exclude:
-                    # cd */.venv/*, .git, ...
-                    if all(exc not in PurePath(dir).parts for exc in self.excluded):
-                        paths.append(dir)
-                        # this entry is a 'cd ...' command, this will help with --cleanup
-                        history[-1]['cdpath'] = dir
+            # remove quotes or \ escaped white spaces
+            dir = dir.rstrip().strip('\'"').replace('\\ ', ' ')
 
-        self._paths: list[str] = paths
-        self._history: list[dict] = history
+        if not dir or cls.excluded_re.search(dir):
+            return None, timestamp
+
+        return dir, timestamp
+
+    @classmethod
+    def entries(cls, lines: Iterable[str], shell: str) -> Iterator[list[str]]:
+        """Group history lines by entry: a fish command with its when/paths lines,
+        a bash command with its '#<time>' line
+        """
+        entry = []
+        for line in lines:
+            if shell == 'fish':
+                starts = line.startswith('- cmd: ')
+            elif shell == 'bash':
+                starts = not (entry and cls.bash_stamp_re.fullmatch(entry[-1]))
+            else:
+                starts = True
+            if starts and entry:
+                yield entry
+                entry = []
+            entry.append(line)
+        if entry:
+            yield entry
 
     @property
-    def history(self):
-        return self._history
+    def history(self) -> Iterator[tuple[str, str | None]]:
+        """Stream history entries with their 'cd' path, None if not a 'cd' entry"""
+        with open(self._histfile) as file:
+            yield from self._stream(file)
+
+    def _stream(self, file: TextIO) -> Iterator[tuple[str, str | None]]:
+        shell = self.shell(self._histfile)
+        for entry in self.entries(file, shell):
+            dirs = [dir for dir, _ in self.records(entry, shell) if dir is not None]
+            yield ''.join(entry), dirs[0] if dirs else None
 
     @property
     def cds(self):
         return tabulate(
-            [entry for entry in self._history if 'cdpath' in entry],
-            headers={'value': 'History entry', 'cdpath': "Extracted 'cd' path"},
+            [(entry.rstrip('\n'), dir) for (entry, dir) in self.history if dir],
+            headers=['History entry', "Extracted 'cd' path"],
             tablefmt='presto',
         )
 
-    def get(self) -> list[tuple[str, int]]:
-        """Returns a list of tuples: path, weight.
+    def get(self, pwd: str | None = None) -> list[tuple[str, int, float]]:
+        """Returns a list of tuples: path, weight, frecency.
+
+        Relative paths are relative to pwd (default: $PWD)
 
-        paths are then ordered from the most visited down
+        Each unique history path gets checked once, its weight being the
+        number of times it was seen (see StatCache for the checks themselves)
+
+        paths come already ranked by frecency (see Ranking), they only
+        need sorting again when several history entries lead to the same path
         """
-        paths: list[Path] = []
+        stats = self._stat_cache
+        calls = stats.calls
+        home = Path.home()
+        home_id = stats.dir_id(home)
 
-        for p in self._paths:
-            path = Path(p).expanduser()
-            if path.is_dir():
-                if path.is_absolute():
-                    paths.append(path)
+        # For relative paths, absolute() resolves links,
+        # Path().cwd() does the same.
+        # Since I want to keep them, I use PWD!
+        cwd = Path(pwd or env['PWD'])
+        scale = self._ranking.scale(time.time())
+
+        paths: dict[str, list] = {}
+        merged = False
+        self.cwd_dependent = False
+
+        def add(path: Path, weight: int, score: float) -> None:
+            nonlocal merged
+
+            # already looked up by the caller, weight 0 to count it once
+            if stats.dir_id(path, 0) != home_id:
+                key = os.path.normpath(path).replace(str(home), '~')
+                if key in paths:
+                    paths[key][0] += weight
+                    paths[key][1] += score
+                    merged = True
                 else:
-                    # For relative paths, absolute() below resolves links,
-                    # Path().cwd() does the same.
-                    # Since I want to keep them, I use PWD!
-                    paths.append(Path(env['PWD']).joinpath(path))
-            elif not path.is_absolute():
+                    paths[key] = [weight, score]
+
+        for p, weight, score in self._ranking:
+            score *= scale
+            path = Path(p).expanduser()
+            if path.is_absolute():
+                if stats.is_dir(path, weight):
+                    add(path, weight, score)
+                continue
+
+            self.cwd_dependent = True
+
+            if stats.is_dir(cwd / path, weight):
+                add(cwd / path, weight, score)
+            else:
                 # cd old new # zsh feature
                 # not checking cases with white spaces
                 old_new = p.split()
 
-                if len(old_new) == 2 and all(Path(_p).is_dir() for _p in old_new):
-                    paths.extend(Path(env['PWD']).joinpath(_p) for _p in old_new)
+                if len(old_new) == 2 and all(
+                    stats.is_dir(cwd / _p, weight) for _p in old_new
+                ):
+                    for _p in old_new:
+                        add(cwd / _p, weight, score)
                 else:
-                    h_path = Path.home().joinpath(path)
-                    if h_path.is_dir():
-                        paths.append(h_path)
-
-        return sorted(
-            Counter(
-                os.path.normpath(p.absolute()).replace(str(Path.home()), '~')
-                for p in paths
-                if p.resolve() != Path.home()
-            ).items(),
-            key=operator.itemgetter(1),
-            reverse=True,
-        )
+                    h_path = home.joinpath(path)
+                    if stats.is_dir(h_path, weight):
+                        add(h_path, weight, score)
+
+        stats.save()
+
+        profile.count('stat calls', stats.calls - calls)
+        profile.count('ranked paths', len(paths))
+
+        ranking = [(p, w, s) for (p, (w, s)) in paths.items()]
+        if merged:
+            ranking.sort(key=operator.itemgetter(2), reverse=True)
+
+        return ranking
+
+    def ranked(self, pwd: str | None = None) -> str:
+        """Paths, one per line, as fed to fzf"""
+        with profile.phase('ranking'):
+            return '\n'.join(path[0] for path in self.get(pwd))
+
+    @property
+    def stat_calls_saved(self) -> int:
+        """Directory checks answered without a stat() call: duplicates + cache hits"""
+        return self._stat_cache.lookups - self._stat_cache.calls
 
     @property
     def stats(self) -> str:
-        return tabulate(
-            [(p, w) for (p, w) in self.get() if w > 1] + [('...', 1)],
-            headers=['Location', 'Weight'],
-            colalign=('right', 'left'),
+        table = tabulate(
+            [(p, w, s) for (p, w, s) in self.get() if w > 1] + [('...', 1, '')],
+            headers=['Location', 'Weight', 'Frecency'],
+            colalign=('right', 'left', 'left'),
+            floatfmt='.2f',
         )
+        calls = self._stat_cache.calls
+        return f'{table}\n\nstat calls: {calls} (saved {self.stat_calls_saved})'
 
 
 class CDPathsInvalid(CDPaths):
+    stat_ttl = 0  # paths get deleted from history, always check them again
+    stat_timeout = 2  # seconds, paths on a mount this slow are unreachable
+
     def get(self) -> list[tuple[str, int]]:
-        """Returns a list of tuples: ipath, occurences"""
-        ipaths: list[str] = []
+        """Returns a list of tuples: ipath, occurences
 
-        for p in self._paths:
-            path = Path(p).expanduser()
-            if not path.is_dir() and path.is_absolute():
-                ipaths.append(p)
+        Paths get checked concurrently, one thread per mount. A check taking
+        over stat_timeout (dead automount, sshfs, ...) leaves that path and
+        the rest of its mount unchecked: unreachable, not invalid.
 
-        return sorted(Counter(ipaths).items(), key=operator.itemgetter(1), reverse=True)
+        Sets self.unreachable: a list of tuples: path, occurences
+        """
+        import threading
 
-    @property
-    def stats(self) -> str:
-        return tabulate(
-            [(p, o) for (p, o) in self.get()],
+        mounts: dict[str, list[tuple[str, int]]] = {}
+        for p, occurences, _ in self._ranking:
+            path = os.path.expanduser(p)
+            if os.path.isabs(path):
+                mounts.setdefault(self._mount(path), []).append((p, occurences))
+
+        def check(paths: list[tuple[str, int]], state: dict) -> None:
+            for p, _ in paths:
+                state['started'] = time.monotonic()
+                state['dirs'].append(os.path.isdir(os.path.expanduser(p)))
+
+        checks = []
+        for paths in mounts.values():
+            state = {'started': time.monotonic(), 'dirs': []}
+            # a hung stat() can't be interrupted, don't wait for it on exit
+            thread = threading.Thread(target=check, args=(paths, state), daemon=True)
+            thread.start()
+            checks.append((thread, paths, state))
+
+        ipaths: list[tuple[str, int]] = []
+        self.unreachable: list[tuple[str, int]] = []
+
+        for thread, paths, state in checks:
+            while thread.is_alive():
+                timeout = state['started'] + self.stat_timeout - time.monotonic()
+                if timeout <= 0:
+                    break
+                thread.join(timeout)
+
+            dirs = state['dirs'][:]
+            ipaths.extend(path for path, is_dir in zip(paths, dirs) if not is_dir)
+            self.unreachable.extend(paths[len(dirs) :])
+
+        profile.count('unreachable paths', len(self.unreachable))
+
+        self.unreachable.sort(key=operator.itemgetter(1), reverse=True)
+
+        return sorted(ipaths, key=operator.itemgetter(1), reverse=True)
+
+    @staticmethod
+    @functools.cache
+    def _mounts() -> frozenset[str]:
+        """Mount points, from /proc/mounts (Linux)"""
+        try:
+            with open('/proc/mounts') as file:
+                mounts = [line.split()[1] for line in file]
+        except (OSError, IndexError):
+            return frozenset()
+
+        # spaces and such are octal escaped: \040
+        return frozenset(
+            re.sub(r'\\([0-7]{3})', lambda match: chr(int(match[1], 8)), mount)
+            for mount in mounts
+        )
+
+    @classmethod
+    def _mount(cls, path: str) -> str:
+        """Mount point of path, or its first two components if unknown"""
+        if mounts := cls._mounts():
+            while path not in mounts and path != '/':
+                path = os.path.dirname(path)
+            return path
+
+        return '/'.join(os.path.normpath(path).split('/')[:3])
+
+    def report(self, ipaths: list[tuple[str, int]]) -> str:
+        """Tables of invalid paths (get()) and unreachable ones"""
+        table = tabulate(
+            ipaths,
             headers=['Invalid paths', 'Occurences'],
             colalign=('right', 'left'),
         )
 
+        if self.unreachable:
+            unreachable = tabulate(
+                self.unreachable,
+                headers=['Unreachable paths', 'Occurences'],
+                colalign=('right', 'left'),
+            )
+            table = f'{table}\n\n{unreachable}' if ipaths else unreachable
+
+        return table
+
+    @property
+    def stats(self) -> str:
+        return self.report(self.get())
+
+    lock_timeout = 10  # seconds, zsh considers older HISTFILE.LOCKs stale
+
+    @contextmanager
+    def _lock(self) -> Iterator[TextIO]:
+        """Open the history, holding the locks shells honor while writing it
+
+        HISTFILE.LOCK: zsh's default lock file
+        fcntl lock: zsh with HIST_FCNTL_LOCK
+
+        Both on the file a symlinked HISTFILE points to
+
+        Raises:
+            TimeoutError: either lock wasn't released in time
+        """
+        histfile = os.path.realpath(self._histfile)
+        lockfile = Path(f'{histfile}.LOCK')
+        deadline = time.monotonic() + self.lock_timeout
+
+        while True:
+            try:
+                fd = os.open(lockfile, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - lockfile.stat().st_mtime > self.lock_timeout:
+                        lockfile.unlink()  # stale
+                        continue
+                except FileNotFoundError:
+                    continue
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f'{lockfile} held by another process')
+                time.sleep(0.1)
+
+        try:
+            os.write(fd, f'{os.getpid()}\n'.encode())
+            os.close(fd)
+
+            # r+: fcntl write locks need a file opened for writing
+            with open(histfile, 'r+') as file:
+                while True:
+                    try:
+                        fcntl.lockf(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except (BlockingIOError, PermissionError):
+                        if time.monotonic() > deadline:
+                            raise TimeoutError(f'{histfile} locked by another process')
+                        time.sleep(0.1)
+                yield file
+        finally:
+            lockfile.unlink(missing_ok=True)
+
+    def cleanup(self, ipaths: list[tuple[str, int]]) -> bool:
+        """Delete 'cd' entries to invalid paths from history
+
+        With the history locked, stream it through a filter into a temporary
+        file next to it, fsync that file and rename it over the history.
+        Lines appended meanwhile by shells not honoring the locks get copied
+        over before the rename.
+
+        Returns:
+            False, leaving the history untouched, if fewer entries than the
+            occurences of ipaths were found
+        """
+        import tempfile
+
+        invalid_paths = {ipath[0] for ipath in ipaths}
+        occurences = sum(ipath[1] for ipath in ipaths)
+
+        # a symlink (dotfiles) stays one, replacing the file it points to
+        histfile = Path(os.path.realpath(self._histfile))
+        fd, tmp = tempfile.mkstemp(dir=histfile.parent, prefix=f'.{histfile.name}.')
+
+        try:
+            with self._lock() as history, os.fdopen(fd, 'w') as file:
+                deleted = 0
+
+                # once more for lines appended during the first pass
+                for _ in range(2):
+                    for entry, dir in self._stream(history):
+                        if dir is not None and dir in invalid_paths:
+                            deleted += 1
+                        else:
+                            file.write(entry)
+
+                if deleted < occurences:
+                    os.unlink(tmp)
+                    return False
+
+                file.flush()
+                os.fchmod(file.fileno(), os.fstat(history.fileno()).st_mode)
+                os.fsync(file.fileno())
+
+                os.replace(tmp, histfile)
+
+            # persist the rename
+            dir_fd = os.open(histfile.parent, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+        return True
+
 
 def main() -> None:
     def validate_histfile(file: File) -> File:
@@ -166,8 +1262,9 @@ def main() -> None:
     parser.add_argument(
         '--histfile',
         type=validate_histfile,
-        help="shell's history file location",
-        default=env.get('HISTFILE', env['XDG_DATA_HOME'] + '/zsh/history'),
+        action='append',
+        help="shell's history file location (bash, zsh or fish)\n"
+        + 'repeat for several shells, --view-cds and --cleanup use the first one',
     )
     parser.add_argument(
         '-s',
@@ -184,6 +1281,35 @@ def main() -> None:
     parser.add_argument(
         '-c', '--cleanup', action='store_true', help='clean invalid paths'
     )
+    parser.add_argument(
+        '--compact',
+        type=int,
+        nargs='?',
+        const=CDPaths.compact_keep,
+        metavar='N',
+        help='rank from the top N paths (default: %(const)s) plus recent ones only\n'
+        + 'keeps the index small however old the history, 0 to stop',
+    )
+    parser.add_argument(
+        '--compact-window',
+        type=float,
+        default=CDPaths.compact_window,
+        metavar='DAYS',
+        help='--compact also keeps paths visited within DAYS (default: %(default)s)',
+    )
+    parser.add_argument(
+        '--daemon',
+        action='store_true',
+        help='serve ranked paths from memory over a Unix socket',
+    )
+    parser.add_argument(
+        '--profile',
+        nargs='?',
+        const='text',
+        choices=['text', 'json'],
+        default=env.get('C_PROFILE'),
+        help='report phase timings and counters on stderr (env: C_PROFILE=text|json)',
+    )
     parser.add_argument(
         'query',
         type=str,
@@ -192,36 +1318,47 @@ def main() -> None:
     )
     args = parser.parse_args()
 
+    histfiles = args.histfile or [
+        env.get('HISTFILE', env['XDG_DATA_HOME'] + '/zsh/history')
+    ]
+    histfile = histfiles[0]
+
+    if args.profile:
+        profile.start(args.profile)
+
     # Start
-    if args.stats:
-        print(CDPaths(args.histfile).stats)
+    if args.daemon:
+        from . import daemon
+
+        daemon.serve()
+
+    elif args.stats:
+        print(CDPaths(*histfiles, indexed=True).stats)
+
+    elif args.compact is not None:
+        for file in histfiles:
+            ranking = CDPaths.compact(file, args.compact, args.compact_window)
+            print(f'{file}: {len(ranking)} paths')
+
+        FzfCache(histfiles, CDPaths.stat_ttl).clear()
 
     elif args.view_cds:
-        print(CDPaths(args.histfile).cds)
+        print(CDPaths(histfile).cds)
 
     elif args.cleanup:
-        cdpaths = CDPathsInvalid(args.histfile)
+        cdpaths = CDPathsInvalid(histfile)
 
         ipaths = cdpaths.get()
+        if ipaths or cdpaths.unreachable:
+            print(cdpaths.report(ipaths))
         if ipaths:
-            print(cdpaths.stats)
             try:
                 if input('\nDelete from history (y/n)? ').lower() in ('y', 'yes'):
-                    lines: list[str] = []
-                    invalid_paths = [ipath[0] for ipath in ipaths]
-
-                    for entry in cdpaths.history:
-                        if (
-                            'cdpath' not in entry
-                            or entry['cdpath'] not in invalid_paths
-                        ):
-                            lines.append(entry['value'])
-
-                    if len(lines) == len(cdpaths.history) - len(invalid_paths):
-                        with open(args.histfile, 'w') as file:
-                            file.writelines(lines)
-                    else:
-                        exit(f'error while writing {args.histfile}')
+                    try:
+                        if not cdpaths.cleanup(ipaths):
+                            exit(f'error while writing {histfile}')
+                    except TimeoutError as err:
+                        exit(f'error while writing {histfile}: {err}')
                 else:
                     print('no')
             except KeyboardInterrupt:
@@ -231,29 +1368,77 @@ def main() -> None:
             print('nothing to cleanup')
 
     else:
-        paths = '\n'.join(path[0] for path in CDPaths(args.histfile).get())
+        from . import client
 
         fzf = ['fzf', '-0', '-1', '--cycle', '--height', '60%']
         if args.query:
             fzf.extend(('-q', args.query))
 
-        proc = run(fzf, input=paths, stdout=PIPE, text=True)
+        pwd = env['PWD']
+        cache = FzfCache(histfiles, CDPaths.stat_ttl)
 
-        if proc.returncode == 0:
-            dir = Path(proc.stdout.rstrip())
+        paths = None
+        with profile.phase('cache'):
+            cached = cache.open(pwd)
+            if cached and args.query:
+                with cached:
+                    paths = cached.read().decode()
+                cached = None
+        profile.count('cache hits', cached is not None or paths is not None)
 
-            # expanduser() is needed for cd -- "$dir" in the shell function to work
-            print(dir.expanduser())
+        if cached is None and paths is None:
+            with profile.phase('daemon'):
+                paths = client.request(histfiles, pwd)
+            profile.count('daemon hits', paths is not None)
+
+            if paths is None:
+                cdpaths = CDPaths(*histfiles, indexed=True)
+                paths = cdpaths.ranked(pwd)
+                cache.write(paths, pwd if cdpaths.cwd_dependent else None)
+
+        # what fzf -0 -1 would do, without starting it
+        selected = None
+        if args.query:
+            try:
+                with profile.phase('query'):
+                    matches = Query(args.query).filter(paths.splitlines(), limit=2)
+            except ValueError:
+                pass  # search syntax left to fzf
+            else:
+                if not matches:
+                    exit(1)
+                if len(matches) == 1:
+                    selected = matches[0]
 
-            # append to shell's history
-            with open(args.histfile, 'a') as file:
-                dir = str(dir).replace(' ', '\\ ')
-                if dir.startswith('-'):
-                    file.write(f'cd -- {dir}\n')
+        if selected is None:
+            with profile.phase('fzf'):
+                if cached:
+                    with cached:
+                        proc = run(fzf, stdin=cached, stdout=PIPE, text=True)
                 else:
-                    file.write(f'cd {dir}\n')
-        else:
-            exit(proc.returncode)
+                    proc = run(fzf, input=paths, stdout=PIPE, text=True)
+
+            if proc.returncode != 0:
+                exit(proc.returncode)
+
+            selected = proc.stdout.rstrip()
+
+        dir = Path(selected)
+
+        # expanduser() is needed for cd -- "$dir" in the shell function to work
+        print(dir.expanduser())
+
+        # append to shell's history
+        with open(histfile, 'a') as file:
+            dir = str(dir).replace(' ', '\\ ')
+            if dir.startswith('-'):
+                cd = f'cd -- {dir}'
+            else:
+                cd = f'cd {dir}'
+
+            file.write(CDPaths.entry(cd, CDPaths.shell(histfile), int(time.time())))
+
+        cache.appended()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,43 @@
+"""
+c daemon client
+
+Kept apart from the daemon itself: plain c calls import this module,
+not socketserver. See daemon for the protocol.
+"""
+
+import json
+import os
+import socket
+from os import environ as env
+from pathlib import Path
+
+from . import File, cache_dir
+
+socket_file = Path(env.get('XDG_RUNTIME_DIR', cache_dir), 'fuzzy_cd.sock')
+timeout = 2  # seconds, a busy or stuck daemon falls back to in-process ranking
+
+
+def request(histfiles: list[File], pwd: str) -> str | None:
+    """Ask the daemon for ranked paths, None if it isn't running, failed or
+    didn't answer within timeout
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(os.fspath(socket_file))
+
+            query = {
+                'histfiles': [os.path.abspath(histfile) for histfile in histfiles],
+                'pwd': pwd,
+            }
+            sock.sendall(json.dumps(query).encode() + b'\n')
+            sock.shutdown(socket.SHUT_WR)
+
+            chunks = []
+            while chunk := sock.recv(65536):
+                chunks.append(chunk)
+    except OSError:  # TimeoutError included
+        return None
+
+    status, _, paths = b''.join(chunks).decode().partition('\n')
+    return paths if status == 'ok' else None
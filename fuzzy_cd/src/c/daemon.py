@@ -0,0 +1,117 @@
+"""
+Resident c server
+
+Keep CDPaths warm in memory, pick up appended history lines by polling
+HISTFILE and answer 'ranked paths' requests over a Unix socket.
+
+A request is a JSON line: {"histfiles": [...], "pwd": ...}
+The reply is a status line, 'ok' followed by the ranked paths one per line
+as fed to fzf, or 'error'.
+"""
+
+import json
+import os
+import signal
+import socket
+import socketserver
+import threading
+import time
+import traceback
+
+from . import CDPaths
+from .client import socket_file
+
+
+class Handler(socketserver.StreamRequestHandler):
+    server: 'Server'
+
+    # requests are handled one at a time: a stalled client (c suspended with
+    # Ctrl-Z, ...) mustn't hold up the others
+    timeout = 1
+
+    def handle(self) -> None:
+        try:
+            query = json.loads(self.rfile.readline())
+            paths = self.server.ranked(tuple(query['histfiles']), query['pwd'])
+        except (ValueError, KeyError, TypeError, OSError):
+            self.wfile.write(b'error\n')  # the client falls back to in-process ranking
+            return
+        except Exception:
+            self.wfile.write(b'error\n')
+            raise  # logged by the server
+
+        self.wfile.write(b'ok\n' + paths.encode())
+
+
+class Server(socketserver.UnixStreamServer):
+    """Ranked paths server, one CDPaths per set of history files requested
+
+    Attributes:
+        interval: seconds between HISTFILE checks
+    """
+
+    def __init__(self, interval: float) -> None:
+        self._cdpaths: dict[tuple[str, ...], tuple[list, CDPaths]] = {}
+        self._lock = threading.Lock()
+        self.interval = interval
+
+        super().__init__(os.fspath(socket_file), Handler)
+
+    @staticmethod
+    def _state(histfiles: tuple[str, ...]) -> list:
+        return [
+            (st.st_ino, st.st_size, st.st_mtime_ns) for st in map(os.stat, histfiles)
+        ]
+
+    def ranked(self, histfiles: tuple[str, ...], pwd: str) -> str:
+        with self._lock:
+            if histfiles not in self._cdpaths:
+                state = self._state(histfiles)
+                cdpaths = CDPaths(*histfiles, indexed=True)
+                self._cdpaths[histfiles] = (state, cdpaths)
+
+            return self._cdpaths[histfiles][1].ranked(pwd)
+
+    def watch(self) -> None:
+        """Poll history files, parsing appended lines as they come"""
+        while True:
+            time.sleep(self.interval)
+
+            with self._lock:
+                for histfiles, (state, cdpaths) in list(self._cdpaths.items()):
+                    try:
+                        new_state = self._state(histfiles)
+                        if new_state != state:
+                            cdpaths.refresh()
+                            self._cdpaths[histfiles] = (new_state, cdpaths)
+                    except OSError:
+                        del self._cdpaths[histfiles]
+                    except Exception:
+                        # reloaded from scratch on the next request
+                        del self._cdpaths[histfiles]
+                        traceback.print_exc()
+
+
+def serve(interval: float = 1) -> None:
+    # a socket left over by a daemon that didn't exit cleanly
+    if socket_file.exists():
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            try:
+                sock.connect(os.fspath(socket_file))
+            except OSError:
+                socket_file.unlink()
+            else:
+                exit(f'c daemon already listening on {socket_file}')
+
+    socket_file.parent.mkdir(parents=True, exist_ok=True)
+
+    signal.signal(signal.SIGTERM, lambda *_: exit())
+
+    with Server(interval) as server:
+        threading.Thread(target=server.watch, daemon=True).start()
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print()
+        finally:
+            socket_file.unlink(missing_ok=True)